@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+'''
+Algebraic normal form of oracles, for synthesising them from gates.
+
+Every Boolean function of x in {0,1}^n is a unique XOR of monomials (ANDs of
+input bits), its algebraic normal form. The ANF coefficients are the Möbius
+transform of the truth table over GF(2), an in-place butterfly like the
+Walsh-Hadamard transform in spectral.py with XOR in place of +/-.
+
+A monomial is written as the bitmask m of the input bits it multiplies, so
+m = 0 is the constant 1 and m = 0b101 is x_0 x_2. |x>|b> -> |x>|b + f(x)>
+is then one X gate controlled on the bits of m per monomial of each output
+bit, which is small for structured oracles.
+'''
+
+
+def mobius(table, width=1):
+    """
+    ANF coefficients of every output bit of f.
+
+    Parameters
+    ----------
+    table : array_like
+        The 2^n entries f(0), f(1), ..., as from oracle.tabulate.
+    width : int
+        Number of output bits of f.
+
+    Returns
+    -------
+    result : np.ndarray
+        (2^n, width) array of 0/1, 1 at [m, j] if monomial m appears in
+        output bit j.
+
+    """
+    table = np.asarray(table, dtype=np.int64)
+    size = len(table)
+    if size & (size - 1):
+        raise ValueError(f"Truth table must have 2^n entries, got {size}")
+
+    coefficients = ((table[:, None] >> np.arange(width)) & 1).astype(np.uint8)
+
+    h = 1
+    while h < size:
+        # Monomials containing bit log2(h) pick up the ones without it
+        view = coefficients.reshape(size // (2 * h), 2, h, width)
+        view[:, 1] ^= view[:, 0]
+        h *= 2
+
+    return coefficients
+
+
+def monomials(table, width=1):
+    """
+    The monomials of f, with the output bits each appears in.
+
+    Parameters
+    ----------
+    table : array_like
+        The 2^n entries f(0), f(1), ..., as from oracle.tabulate.
+    width : int
+        Number of output bits of f.
+
+    Returns
+    -------
+    result : [(int, [int])]
+        (monomial, output bits) for every monomial appearing in some output
+        bit, in increasing order of monomial.
+
+    """
+    coefficients = mobius(table, width)
+    present = np.flatnonzero(coefficients.any(axis=1))
+    return [(int(m), np.flatnonzero(coefficients[m]).tolist()) for m in present]
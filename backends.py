@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+'''
+Deferred access to the quantum SDKs.
+
+Importing qiskit (with Aer) or pyquil (with its API clients) takes longer than
+everything else a short-lived worker does before its first circuit. The
+algorithm modules only reach the SDKs through the functions here, which import
+them on first use, so importing an algorithm module is cheap and a process that
+never builds a circuit (analytic, batched or classical paths) never pays for
+the SDK at all.
+
+bench_import.py tracks the resulting import times.
+'''
+
+_simulators = {}
+
+# Whether Aer has run in this process, after which it mustn't be forked (its
+# OpenMP threads don't survive it; see policy.pool_context)
+simulated = False
+
+
+def qiskit():
+    """
+    The qiskit package, imported on first use.
+    """
+    import qiskit
+    return qiskit
+
+
+def quantum_circuit(*args):
+    """
+    A qiskit QuantumCircuit.
+    """
+    return qiskit().QuantumCircuit(*args)
+
+
+def operator(data):
+    """
+    A qiskit Operator wrapping a matrix.
+
+    The Operator (and any UnitaryGate made from it) holds complex128 whatever
+    the dtype of data, and Aer applies unitaries in double precision, so
+    building matrices compactly only saves the scratch copy.
+    """
+    from qiskit.quantum_info.operators import Operator
+    return Operator(data)
+
+
+def simulator(name='qasm_simulator'):
+    """
+    An Aer backend, created once per process.
+    """
+    if name not in _simulators:
+        _simulators[name] = qiskit().Aer.get_backend(name)
+    return _simulators[name]
+
+
+def execute(circuit, shots, name='qasm_simulator', seed=None, **options):
+    """
+    Run a circuit on an Aer backend.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        Circuit to run.
+    shots : int
+        Number of shots.
+    name : str
+        Aer backend to use.
+    seed : int
+        Seed for the simulator's sampling, or None for a random one.
+    options :
+        Run options forwarded to the backend (precision, threads, ...).
+
+    Returns
+    -------
+    result : Job
+
+    """
+    global simulated
+
+    if seed is not None:
+        options['seed_simulator'] = seed
+    simulated = True
+    return qiskit().execute(circuit, simulator(name), shots=shots, **options)
+
+
+def probabilities(circuit, qubits, **options):
+    """
+    Exact distribution of measuring some qubits of a circuit.
+
+    The circuit's final measurements are dropped and the rest is simulated
+    once on Aer's statevector simulator, instead of sampling shots.
+
+    Parameters
+    ----------
+    circuit : QuantumCircuit
+        Circuit to simulate.
+    qubits : [int]
+        Measured qubits, qubits[0] giving the most significant bit of the
+        outcome (as the algorithms read their measurements).
+    options :
+        Run options forwarded to the backend (precision, threads, ...).
+
+    Returns
+    -------
+    result : np.ndarray
+        2^len(qubits) probabilities, indexed by outcome.
+
+    """
+    bare = circuit.remove_final_measurements(inplace=False)
+    state = execute(bare, shots=1, name='statevector_simulator', **options).result().get_statevector()
+
+    # Axis i of the reshaped probabilities is qubit num_qubits - 1 - i
+    num_qubits = bare.num_qubits
+    probabilities = (np.abs(np.asarray(state)) ** 2).reshape((2,) * num_qubits)
+
+    axes = [num_qubits - 1 - q for q in qubits]
+    probabilities = probabilities.sum(axis=tuple(a for a in range(num_qubits) if a not in axes))
+    probabilities = probabilities.transpose([sorted(axes).index(a) for a in axes]).ravel()
+    return probabilities / probabilities.sum()
+
+
+def pyquil():
+    """
+    The pyquil package, imported on first use.
+    """
+    import pyquil
+    return pyquil
+
+
+def pyquil_gates():
+    """
+    The pyquil.gates module (H, X, MEASURE, ...).
+    """
+    import pyquil.gates
+    return pyquil.gates
+
+
+def program(*instructions):
+    """
+    A pyquil Program.
+    """
+    return pyquil().Program(*instructions)
+
+
+def def_permutation_gate(name, permutation):
+    """
+    A pyquil DefPermutationGate defining a named gate by where it sends each
+    basis state, written to Quil as DEFGATE ... AS PERMUTATION.
+    """
+    from pyquil.quil import DefPermutationGate
+    return DefPermutationGate(name, [int(p) for p in permutation])
+
+
+def get_qc(name):
+    """
+    A pyquil QuantumComputer, e.g. get_qc('3q-qvm').
+    """
+    return pyquil().get_qc(name)
+
+
+def run_executable(qc, executable, shots, lock, seed=None, executable_shots=1):
+    """
+    Take shots of a compiled pyquil executable.
+
+    The QAM behind a QuantumComputer holds the state of the job it is
+    running, so calls sharing qc are serialised by lock.
+
+    Parameters
+    ----------
+    qc : QuantumComputer
+        The computer the executable was compiled for.
+    executable :
+        Result of qc.compile.
+    shots : int
+        Number of shots.
+    lock : threading.Lock
+        Lock held while qc is in use.
+    seed : int
+        Seed for the QVM's sampling, or None to leave it as it is.
+    executable_shots : int
+        Shots per execution, as compiled (wrap_in_numshots_loop).
+
+    Returns
+    -------
+    result : np.ndarray
+        (shots, len(ro)) array of bits, ro[0] first.
+
+    """
+    rows = []
+    taken = 0
+    with lock:
+        # The QVM reads its seed per job; put back whatever it had after
+        previous = getattr(qc.qam, 'random_seed', None)
+        if seed is not None:
+            qc.qam.random_seed = seed
+        try:
+            # A short final execution still takes executable_shots; the extras are dropped
+            while taken < shots:
+                rows.append(np.asarray(qc.run(executable)))
+                taken += executable_shots
+        finally:
+            if seed is not None:
+                qc.qam.random_seed = previous
+
+    return np.concatenate(rows)[:shots] if rows else np.zeros((0, 0), dtype=int)
+
+
+def wavefunction(program):
+    """
+    Probabilities of every basis state after a pyquil program, from one
+    WavefunctionSimulator call.
+
+    Returns
+    -------
+    result : np.ndarray
+        2^q probabilities, where bit q of the index is qubit q.
+
+    """
+    from pyquil.api import WavefunctionSimulator
+    probabilities = WavefunctionSimulator().wavefunction(program).probabilities()
+    return probabilities / probabilities.sum()
+
+
+def sample(probabilities, qubits, shots, seed=None):
+    """
+    Sample measurements locally from wavefunction probabilities.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        Probabilities as returned by wavefunction().
+    qubits : [int]
+        Measured qubits, in the order they are read out into ro.
+    shots : int
+        Number of shots.
+    seed : int or np.random.Generator
+        Seed for the samples.
+
+    Returns
+    -------
+    result : np.ndarray
+        (shots, len(qubits)) array of bits, shaped like QuantumComputer.run output.
+
+    """
+    xs = np.random.default_rng(seed).choice(len(probabilities), shots, p=probabilities)
+    return (xs[:, None] >> np.asarray(list(qubits))) & 1
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+'''
+Import-time benchmark for the algorithm modules.
+
+Each module is imported in a fresh interpreter with -X importtime. The table
+shows the cumulative import time of the module, the wall time of the whole
+interpreter start-up, and whether the import pulled in a quantum SDK (it
+shouldn't: backends.py defers qiskit and pyquil until a circuit is built).
+
+Exits with status 1 if any module takes longer than --max-ms to import or
+imports an SDK, so regressions show up wherever this is run.
+'''
+
+MODULES = [
+    'deutsch_jozsa',
+    'bernstein_vazirani',
+    'grover',
+    'simon',
+    'main',
+]
+
+SDKS = ('qiskit', 'qiskit_aer', 'pyquil')
+
+
+def measure(module):
+    """
+    Import module in a fresh interpreter.
+
+    Returns
+    -------
+    result : (float, float, [str])
+        Cumulative import time (ms), interpreter wall time (ms), and the SDK
+        packages that were imported.
+
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    start = time.time()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             cwd=here, capture_output=True, text=True, check=True)
+    wall = (time.time() - start) * 1000
+
+    cumulative = 0
+    imported = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        name = name.strip()
+        if name == module:
+            cumulative = int(total) / 1000
+        if name.split('.')[0] in SDKS:
+            imported.add(name.split('.')[0])
+
+    return cumulative, wall, sorted(imported)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import time of the algorithm modules.")
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--max-ms', type=float, default=500,
+                        help="fail if a module's cumulative import time exceeds this")
+    args = parser.parse_args()
+
+    failed = False
+    print("module\t\t\timport (ms)\tstartup (ms)\tSDKs\n" + '-' * 70)
+    for module in args.modules:
+        cumulative, wall, imported = measure(module)
+        failed |= cumulative > args.max_ms or bool(imported)
+        print(f"{module:<20}\t{cumulative:.1f}\t\t{wall:.1f}\t\t{', '.join(imported) or '-'}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import argparse
+import deutsch_jozsa
+import grover
+import main
+import policy
+import time
+
+'''
+Compare core splits for a batch of concurrent jobs.
+
+Runs the same batch of Grover and Deutsch-Jozsa instances under
+    serial          one instance at a time, every core to the simulator
+    oversubscribed  one instance per core, every core to each simulator
+    policy          policy.ExecutionPolicy choosing the split per job size
+and prints the wall time of each. Each setting is timed in a fresh process so
+simulator thread pools started by one setting don't leak into the next.
+'''
+
+
+def batch(repeats):
+    grover_tests = [((n, lambda x: int(x == 1)), 1) for n in (6, 7, 8)] * repeats
+    dj_tests = [((n, lambda x: x % 2), 0) for n in (7, 8, 9)] * repeats
+    return [(grover_tests, grover.Grover), (dj_tests, deutsch_jozsa.DeutschJozsa)]
+
+
+def time_policy(execution_policy, repeats):
+    policy.set_policy(execution_policy)
+    start = time.time()
+    for tests, algorithm in batch(repeats):
+        for _ in main.run_cases(tests, algorithm, {}, parallel=True):
+            pass
+    return time.time() - start
+
+
+def _measure(execution_policy, repeats, connection):
+    connection.send(time_policy(execution_policy, repeats))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark core splits between jobs and simulator threads.")
+    parser.add_argument('--repeats', type=int, default=4, help="copies of each case in the batch")
+    args = parser.parse_args()
+
+    cores = policy.ExecutionPolicy().cores
+    context = policy.pool_context()
+
+    settings = [
+        ('serial', policy.ExecutionPolicy(workers=1, threads=cores)),
+        ('oversubscribed', policy.ExecutionPolicy(workers=cores, threads=cores)),
+        ('policy', policy.ExecutionPolicy()),
+    ]
+
+    print(f"{cores} cores\n" + '-' * 40)
+    print("split\t\t\twall time (s)\n" + '-' * 40)
+    for name, execution_policy in settings:
+        # Not a Pool: its daemonic workers couldn't start pools of their own
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=_measure, args=(execution_policy, args.repeats, sender))
+        process.start()
+        elapsed = receiver.recv()
+        process.join()
+        print(f"{name:<16}\t{elapsed:.4f}")
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
+import backends
+import classical
 import numpy as np
-from qiskit import *
-from qiskit.quantum_info.operators import Operator
+import oracle
+import outofcore
+import policy
+import resources
 
 class BernsteinVazirani:
     """
@@ -12,12 +16,27 @@ class BernsteinVazirani:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda or oracle.TruthTable
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}.
         * note: f should have the form y = a*x+b, where...
             - a is a bitstring of length n
             - b is a single bit
+    mode : str
+        'circuit' simulates the circuit on Aer. 'classical' solves from the
+        truth table of f with classical.py instead, as a baseline.
+        'out_of_core' simulates it with outofcore.py on a statevector in a
+        memory-mapped file, for n too large to hold one in RAM.
+    precision : str
+        'double' or 'single'. Single precision halves the memory Aer
+        uses for the statevector. Oracle matrices stay complex128 either
+        way, as qiskit and Aer only hold unitaries in double precision.
+    cache : cache.DistributionCache
+        If given, the measurement distribution is looked up by truth table
+        before building anything, and run() samples from it.
+    budget : resources.Budget
+        Memory/time limits checked before construction. Defaults to
+        resources.default_budget.
 
     Return Value
     ----------
@@ -33,19 +52,74 @@ class BernsteinVazirani:
     ```
     """
 
-    def __init__(self, n, f):
+    def __init__(self, n, f, mode='circuit', precision='double', cache=None, budget=None):
+        if mode not in ('circuit', 'classical', 'out_of_core'):
+            raise ValueError(f"Unknown mode '{mode}'")
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+
+        budget = resources.default_budget if budget is None else budget
+        self.cost = self.estimate(n, mode, precision)
+        budget.check(self.cost)
+
         self.n = n
         self.f = f
+        self.mode = mode
+        self.precision = precision
+        self.cache = cache
         self.uf = None
+        self.table = None
+        self.circuit = None
+        self.distribution = None
+        self.state = None
+
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        elif self.mode == 'out_of_core':
+            self.__simulate()
+        elif self.cache is not None:
+            self.table = oracle.tabulate(self.n, self.f)
+            self.distribution = self.__cached_distribution()
+        else:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
+
+    @classmethod
+    def estimate(cls, n, mode='circuit', precision='double'):
+        """
+        Estimate the resources needed to construct and run an instance.
 
-        self.__construct()
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'circuit', 'classical' or 'out_of_core'.
+        precision : str
+            'double' or 'single'.
+
+        Returns
+        -------
+        result : resources.Estimate
+
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+        if mode == 'out_of_core':
+            # Fill, phase, H, then the scan to measure
+            return outofcore.estimate(n, passes=3 + outofcore.hadamard_passes(n),
+                                      evaluations=2 ** n, precision=precision)
+
+        return resources.estimate_circuit(
+            qubits=n + 1, oracle_qubits=n + 1, oracle_appends=1,
+            gates=1 + (n + 1) + 1 + n + n, evaluations=2 ** n, precision=precision)
 
     def __construct(self):
         """
         Construct program for B-V algorithm.
         """
         # Create a Quantum circuit with n+1 qubits and n classical bits for measurement
-        self.circuit = QuantumCircuit(self.n + 1, self.n)
+        self.circuit = backends.quantum_circuit(self.n + 1, self.n)
 
         # Set helper bit (at index n) to 1
         self.circuit.x(self.n)
@@ -65,21 +139,43 @@ class BernsteinVazirani:
         for q in range(self.n):
             self.circuit.measure(q, q)
 
-    def run(self):
+    def run(self, shots=None, seed=None):
         """
         Run B-V algorithm.
 
+        The instance isn't changed, so run() can be called again, or from
+        several threads at once.
+
+        Parameters
+        ----------
+        shots : int
+            Number of measurements, a being the most frequent. Defaults to 1.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         -------
         result : (int, int)
             Returns tuple of ints, equivalent to bit strings a and b.
 
         """
-        simulator = Aer.get_backend('qasm_simulator')
-        job = execute(self.circuit, simulator, shots=1)
+        if self.mode == 'classical':
+            return classical.bernstein_vazirani(self.table)
+
+        shots = 1 if shots is None else shots
+        if self.distribution is not None or self.state is not None:
+            if self.distribution is not None:
+                samples = np.random.default_rng(seed).choice(2 ** self.n, size=shots, p=self.distribution)
+            else:
+                samples = self.state.sample(shots, seed)
+            values, counts = np.unique(samples, return_counts=True)
+            return (int(values[np.argmax(counts)]), self.f(0))
+
+        job = backends.execute(self.circuit, shots=shots, precision=self.precision, seed=seed,
+                               **policy.current.simulator_options(self.cost.qubits))
         result = job.result()
         counts = result.get_counts(self.circuit)
-        measurement = list(counts.keys())[0]
+        measurement = max(counts, key=counts.get)
 
         # Get a by converting measurement to integer
         a = int(measurement[::-1], 2)
@@ -89,6 +185,32 @@ class BernsteinVazirani:
 
         return (a, b)
 
+    def __simulate(self):
+        """
+        Simulate the circuit out of core, up to measurement.
+        """
+        # With the helper qubit in |->, U_f acts on the first n qubits as the
+        # phase oracle (-1)^f(x), so the helper needn't be stored
+        self.state = outofcore.Statevector(self.n, self.precision)
+        self.state.fill(2 ** (-self.n / 2))
+        self.state.phase(outofcore.marks(self.n, self.f))
+        self.state.hadamard()
+
+    def __cached_distribution(self):
+        """
+        Look up the distribution of the measured qubits, simulating it on a miss.
+        """
+        key = self.cache.key('bernstein_vazirani', self.n, self.table, self.precision)
+        distribution = self.cache.get(key)
+        if distribution is None:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
+                distribution = backends.probabilities(
+                    self.circuit, range(self.n), precision=self.precision,
+                    **policy.current.simulator_options(self.cost.qubits))
+            self.cache.put(key, distribution)
+        return distribution
+
     def __apply_uf(self, qubits):
         """
         Define U_f gate (if not defined) that encodes oracle function f and applies it to qubits.
@@ -101,16 +223,18 @@ class BernsteinVazirani:
         """
 
         if self.uf is None:
+            if self.table is None:
+                self.table = oracle.tabulate(self.n, self.f)
+            table = self.table
+
             # Initializes U_f as a 2^(n+1) by 2^(n+1) matrix of zeros
-            U_f = np.zeros((2 ** (self.n + 1),) * 2, dtype=int)
-
-            # Apply definition of U_f = |x>|b + f(x)> to construct matrix
-            for x in range(2 ** self.n):
-                for b in [0, 1]:
-                    row = (x << 1) ^ b
-                    col = (x << 1) ^ (self.f(x) ^ b)
-                    U_f[row][col] = 1
-            
-            self.uf = Operator(U_f)
+            U_f = np.zeros((2 ** (self.n + 1),) * 2, dtype=np.int8)
+
+            # Apply definition of U_f = |x>|b + f(x)> to construct matrix,
+            # where row = (x << 1) ^ b and col = row ^ f(x)
+            rows = np.arange(2 ** (self.n + 1))
+            U_f[rows, rows ^ table[rows >> 1]] = 1
+
+            self.uf = backends.operator(U_f)
 
         self.circuit.append(self.uf, qubits[::-1])
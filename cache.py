@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+'''
+Cache of exact measurement distributions, shared between instances.
+
+The distribution an algorithm measures is fixed by the algorithm, n and the
+truth table of f, and is stored at the precision it was simulated at.
+Instances constructed with a DistributionCache look it up by those before
+building anything: on a hit they skip the circuit entirely and run()
+samples from the cached distribution; on a miss the circuit is simulated
+once for its exact distribution (statevector, no shots), which is stored
+for the next instance with the same oracle.
+
+Entries are kept in memory up to max_bytes, evicting the least recently
+used, and optionally also written to a directory so they survive the
+process and can be shared between processes.
+
+Only the qiskit algorithm classes take a cache; the pyquil ones in pyquil/
+always build and run their program.
+'''
+
+
+class DistributionCache:
+    """
+    LRU cache of measurement distributions keyed by (algorithm, n, precision,
+    truth table).
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory held by cached distributions, beyond which the least
+        recently used are evicted.
+    directory : str
+        If given, distributions are also saved here as .npy files and
+        loaded from here on a memory miss.
+
+    Examples
+    ----------
+    ```
+    >>> cache = DistributionCache()
+    >>> Grover(4, lambda x: x == 3, cache=cache).run()
+    1
+    >>> Grover(4, lambda x: x == 3, cache=cache).run()
+    1
+    >>> cache.hits, cache.misses
+    (1, 1)
+    ```
+    """
+
+    def __init__(self, max_bytes=2 ** 28, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(algorithm, n, table, precision='double'):
+        """
+        Cache key of an instance.
+
+        Parameters
+        ----------
+        algorithm : str
+            Name of the algorithm, e.g. 'grover'.
+        n : int
+            The length of bit string input to f.
+        table : np.ndarray
+            Truth table of f, as from oracle.tabulate.
+        precision : str
+            'double' or 'single', the precision the distribution is computed at.
+
+        Returns
+        -------
+        result : (str, int, str, str)
+
+        """
+        # Same entries hash the same whatever dtype they were tabulated as
+        digest = hashlib.sha1(np.ascontiguousarray(table, dtype=np.int64).tobytes()).hexdigest()
+        return algorithm, n, precision, digest
+
+    def get(self, key):
+        """
+        The cached distribution for key, or None (counted as a hit or miss).
+        """
+        with self._lock:
+            distribution = self._entries.get(key)
+            if distribution is not None:
+                self._entries.move_to_end(key)
+            elif self.directory is not None and os.path.exists(self._path(key)):
+                distribution = np.load(self._path(key))
+                self._insert(key, distribution)
+
+            if distribution is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return distribution
+
+    def put(self, key, distribution):
+        """
+        Store a distribution.
+        """
+        distribution = np.asarray(distribution)
+        with self._lock:
+            if self.directory is not None:
+                np.save(self._path(key), distribution)
+            self._insert(key, distribution)
+
+    def clear(self):
+        """
+        Drop every distribution held in memory (files on disk are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _insert(self, key, distribution):
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key).nbytes
+        if distribution.nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = distribution
+        self.nbytes += distribution.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def _path(self, key):
+        algorithm, n, precision, digest = key
+        return os.path.join(self.directory, f'{algorithm}-{n}-{precision}-{digest}.npy')
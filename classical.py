@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import resources
+import spectral
+
+'''
+Classical solvers working on truth tables.
+
+These are the baselines the quantum paths are measured against, and the
+ground truth for test cases: each takes the table from oracle.tabulate and
+returns what the corresponding algorithm class's run() returns. They are
+deterministic and touch every entry of the table, so they cost O(2^n) (or
+O(n 2^n) where they sort or transform) on top of evaluating f.
+
+Every algorithm class accepts mode='classical' to run these instead of a
+circuit. prescreen is the exception: it samples a few inputs, and lets
+DeutschJozsa skip the circuit when they already prove f balanced.
+'''
+
+
+def estimate(n):
+    """
+    Estimate the resources needed to tabulate f and solve classically.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+
+    Returns
+    -------
+    result : resources.Estimate
+
+    """
+    # int64 truth table plus a sort order or spectrum of the same size
+    table_bytes = 2 ** n * 2 * 8
+    ops = 2 ** n * max(n, 1)
+    return resources.Estimate(0, 0, table_bytes, 0,
+                              ops / resources.OPS_PER_SECOND + 2 ** n / resources.CALLS_PER_SECOND)
+
+
+def deutsch_jozsa(table):
+    """
+    1 if f is constant and 0 if it is balanced, by checking all entries are equal.
+    """
+    table = np.asarray(table)
+    return int((table == table[0]).all())
+
+
+def prescreen(n, f, samples, seed=None):
+    """
+    Look for a balanced Deutsch-Jozsa oracle from a few evaluations of f.
+
+    Under the promise that f is constant or balanced, any two inputs with
+    different outputs prove it balanced. A balanced f escapes detection by k
+    samples with probability about 2^(1 - k).
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    f : lambda or oracle.TruthTable
+        The oracle.
+    samples : int
+        Number of random inputs to evaluate f on.
+    seed : int or np.random.Generator
+        Seed for the choice of inputs, for reproducible answers.
+
+    Returns
+    -------
+    result : int or None
+        0 (balanced) if the samples disagree, and None if they don't decide.
+
+    """
+    xs = np.random.default_rng(seed).integers(0, 2 ** n, size=samples, dtype=np.int64)
+    values = {int(f(int(x))) for x in xs}
+    return 0 if len(values) > 1 else None
+
+
+def bernstein_vazirani(table):
+    """
+    (a, b) for f(x) = a·x + b. a is the peak of the Walsh-Hadamard spectrum of
+    (-1)^f, and b is f(0).
+    """
+    return spectral.bernstein_vazirani(table)[0]
+
+
+def simon(table):
+    """
+    s such that f(x) = f(y) iff x + y in {0, s}, or 0 if f is one-to-one.
+
+    Sorting the inputs by f(x) puts colliding inputs next to each other, and
+    any colliding pair x, y gives s = x + y.
+    """
+    table = np.asarray(table)
+    xs = np.argsort(table, kind='stable')
+    same = np.flatnonzero(table[xs[:-1]] == table[xs[1:]])
+    if same.size == 0:
+        return 0
+    return int(xs[same[0]] ^ xs[same[0] + 1])
+
+
+def marked(table):
+    """
+    Every x with f(x) = 1.
+    """
+    return np.flatnonzero(np.asarray(table) == 1)
+
+
+def grover(table):
+    """
+    1 if some x has f(x) = 1, and 0 otherwise.
+    """
+    return int(marked(table).size > 0)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+'''
+Oracles given as formulas in conjunctive normal form.
+
+A CNF is callable like any other oracle (f(x) = 1 iff x satisfies every
+clause), but Grover recognises it and synthesises Z_f from the clauses
+instead of tabulating all 2^n inputs, so building the circuit costs time
+linear in the size of the formula. The clauses share a handful of ancilla
+qubits (logarithmic in their number), so the statevector stays near 2^n.
+
+Variables are numbered from 1 as in DIMACS, and variable v is bit v - 1 of
+the input x.
+'''
+
+
+class CNF:
+    """
+    Boolean formula in conjunctive normal form.
+
+    Parameters
+    ----------
+    n : int
+        Number of variables.
+    clauses : [[int]]
+        Each clause as a list of nonzero literals: v for variable v and -v
+        for its negation, with 1 <= v <= n.
+
+    Examples
+    ----------
+    ```
+    >>> f = CNF(3, [[1, -2], [2, 3], [-1, -3]])
+    >>> f(0b011), f(0b101)
+    (1, 0)
+    >>> Grover(3, f).run()
+    1
+    ```
+    """
+
+    def __init__(self, n, clauses):
+        self.n = n
+        self.clauses = []
+        for clause in clauses:
+            literals = set(clause)
+            if any(literal == 0 or abs(literal) > n for literal in literals):
+                raise ValueError(f"Literals must be nonzero variables in [1, {n}], got {clause}")
+
+            # A clause with both v and -v always holds
+            if any(-literal in literals for literal in literals):
+                continue
+            self.clauses.append(sorted(literals, key=abs))
+
+    @classmethod
+    def parse_dimacs(cls, text):
+        """
+        Read a formula from DIMACS CNF text.
+
+        Parameters
+        ----------
+        text : str
+            A 'p cnf <variables> <clauses>' header followed by clauses, each
+            a list of literals terminated by 0. Lines starting with 'c' are
+            comments, and a line starting with '%' ends the formula.
+
+        Returns
+        -------
+        result : CNF
+
+        """
+        n = None
+        clauses = []
+        clause = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('c'):
+                continue
+            if line.startswith('%'):
+                break
+            if line.startswith('p'):
+                _, kind, variables, _ = line.split()
+                if kind != 'cnf':
+                    raise ValueError(f"Expected a 'p cnf' header, got '{line}'")
+                n = int(variables)
+                continue
+
+            for literal in map(int, line.split()):
+                if literal == 0:
+                    clauses.append(clause)
+                    clause = []
+                else:
+                    clause.append(literal)
+
+        if n is None:
+            raise ValueError("Missing 'p cnf' header")
+        if clause:
+            clauses.append(clause)
+        return cls(n, clauses)
+
+    @classmethod
+    def from_dimacs(cls, path):
+        """
+        Read a formula from a DIMACS CNF file.
+        """
+        with open(path) as file:
+            return cls.parse_dimacs(file.read())
+
+    def __call__(self, x):
+        def holds(literal):
+            return (x >> (abs(literal) - 1)) & 1 == (literal > 0)
+
+        return int(all(any(holds(literal) for literal in clause) for clause in self.clauses))
@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 
+import backends
+import classical
 import numpy as np
-from qiskit import *
-from qiskit.quantum_info.operators import Operator
+import oracle
+import outofcore
+import policy
+import resources
 
 class DeutschJozsa:
     """
@@ -12,9 +16,29 @@ class DeutschJozsa:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda or oracle.TruthTable
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}.
+    mode : str
+        'circuit' simulates the circuit on Aer. 'classical' solves from the
+        truth table of f with classical.py instead, as a baseline.
+        'out_of_core' simulates it with outofcore.py on a statevector in a
+        memory-mapped file, for n too large to hold one in RAM.
+    precision : str
+        'double' or 'single'. Single precision halves the memory Aer
+        uses for the statevector. Oracle matrices stay complex128 either
+        way, as qiskit and Aer only hold unitaries in double precision.
+    prescreen : int
+        If nonzero, evaluate f on this many random inputs first and answer
+        balanced without building the circuit if they disagree.
+    prescreen_seed : int
+        Seed for the prescreen's inputs, for reproducible construction.
+    cache : cache.DistributionCache
+        If given, the measurement distribution is looked up by truth table
+        before building anything, and run() samples from it.
+    budget : resources.Budget
+        Memory/time limits checked before construction. Defaults to
+        resources.default_budget.
 
     Examples
     ----------
@@ -26,19 +50,82 @@ class DeutschJozsa:
     ```
     """
 
-    def __init__(self, n, f):
+    def __init__(self, n, f, mode='circuit', precision='double', prescreen=0, prescreen_seed=None, cache=None,
+                 budget=None):
+        if mode not in ('circuit', 'classical', 'out_of_core'):
+            raise ValueError(f"Unknown mode '{mode}'")
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+
         self.n = n
         self.f = f
+        self.mode = mode
+        self.precision = precision
+        self.cache = cache
         self.uf = None
+        self.table = None
+        self.circuit = None
+        self.distribution = None
+        self.state = None
+
+        # Which path answers run(): 'prescreen', or the mode
+        self.verdict = classical.prescreen(n, f, prescreen, prescreen_seed) if prescreen else None
+        self.answered_by = mode if self.verdict is None else 'prescreen'
+
+        self.cost = self.estimate(n, mode, precision)
+        if self.verdict is not None:
+            return
+
+        budget = resources.default_budget if budget is None else budget
+        budget.check(self.cost)
+
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        elif self.mode == 'out_of_core':
+            self.__simulate()
+        elif self.cache is not None:
+            self.table = oracle.tabulate(self.n, self.f)
+            self.distribution = self.__cached_distribution()
+        else:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
+
+    @classmethod
+    def estimate(cls, n, mode='circuit', precision='double'):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'circuit', 'classical' or 'out_of_core'.
+        precision : str
+            'double' or 'single'.
+
+        Returns
+        -------
+        result : resources.Estimate
 
-        self.__construct()
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+        if mode == 'out_of_core':
+            # Fill, phase, H, then the scan to measure
+            return outofcore.estimate(n, passes=3 + outofcore.hadamard_passes(n),
+                                      evaluations=2 ** n, precision=precision)
+
+        return resources.estimate_circuit(
+            qubits=n + 1, oracle_qubits=n + 1, oracle_appends=1,
+            gates=1 + (n + 1) + 1 + n + n, evaluations=2 ** n, precision=precision)
 
     def __construct(self):
         """
         Construct program for Deutsch-Jozsa algorithm.
         """
         # Create a Quantum circuit with n+1 qubits and n classical bits for measurement
-        self.circuit = QuantumCircuit(self.n + 1, self.n)
+        self.circuit = backends.quantum_circuit(self.n + 1, self.n)
 
         # Set helper bit (at index n) to 1
         self.circuit.x(self.n)
@@ -58,25 +145,72 @@ class DeutschJozsa:
         for q in range(self.n):
             self.circuit.measure(q, q)
 
-    def run(self):
+    def run(self, shots=None, seed=None):
         """
         Run Deutsch-Jozsa algorithm.
 
+        The instance isn't changed, so run() can be called again, or from
+        several threads at once.
+
+        Parameters
+        ----------
+        shots : int
+            Number of measurements, all of which must be 0 for f to be
+            called constant. Defaults to 1.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         -------
-        result : (int, int)
-            Returns tuple of ints, equivalent to bit strings a and b.
+        result : int
+            Returns 1 if self.f is constant or 0 if self.f is balanced.
 
         """
-        simulator = Aer.get_backend('qasm_simulator')
-        job = execute(self.circuit, simulator, shots=1)
+        if self.verdict is not None:
+            return self.verdict
+        if self.mode == 'classical':
+            return classical.deutsch_jozsa(self.table)
+
+        shots = 1 if shots is None else shots
+        if self.distribution is not None:
+            return int(not np.random.default_rng(seed).choice(2 ** self.n, size=shots, p=self.distribution).any())
+        if self.state is not None:
+            return int(not self.state.sample(shots, seed).any())
+
+        job = backends.execute(self.circuit, shots=shots, precision=self.precision, seed=seed,
+                               **policy.current.simulator_options(self.cost.qubits))
         result = job.result()
         counts = result.get_counts(self.circuit)
-        measurement = list(counts.keys())[0]
 
         # If output is all zeros, function is constant.
         # The expression is cast to an int (False = 0 => balanced, True = 1 => constant)
-        return int(measurement == '0' * self.n)
+        return int(all(measurement == '0' * self.n for measurement in counts))
+
+    def __simulate(self):
+        """
+        Simulate the circuit out of core, up to measurement.
+        """
+        # With the helper qubit in |->, U_f acts on the first n qubits as the
+        # phase oracle (-1)^f(x), so the helper needn't be stored
+        self.state = outofcore.Statevector(self.n, self.precision)
+        self.state.fill(2 ** (-self.n / 2))
+        self.state.phase(outofcore.marks(self.n, self.f))
+        self.state.hadamard()
+
+    def __cached_distribution(self):
+        """
+        Look up the distribution of the measured qubits, simulating it on a miss.
+        """
+        key = self.cache.key('deutsch_jozsa', self.n, self.table, self.precision)
+        distribution = self.cache.get(key)
+        if distribution is None:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
+                distribution = backends.probabilities(
+                    self.circuit, range(self.n), precision=self.precision,
+                    **policy.current.simulator_options(self.cost.qubits))
+            self.cache.put(key, distribution)
+        return distribution
 
     def __apply_uf(self, qubits):
         """
@@ -90,16 +224,18 @@ class DeutschJozsa:
         """
 
         if self.uf is None:
+            if self.table is None:
+                self.table = oracle.tabulate(self.n, self.f)
+            table = self.table
+
             # Initializes U_f as a 2^(n+1) by 2^(n+1) matrix of zeros
-            U_f = np.zeros((2 ** (self.n + 1),) * 2, dtype=int)
-
-            # Apply definition of U_f = |x>|b + f(x)> to construct matrix
-            for x in range(2 ** self.n):
-                for b in [0, 1]:
-                    row = (x << 1) ^ b
-                    col = (x << 1) ^ (self.f(x) ^ b)
-                    U_f[row][col] = 1
-            
-            self.uf = Operator(U_f)
+            U_f = np.zeros((2 ** (self.n + 1),) * 2, dtype=np.int8)
+
+            # Apply definition of U_f = |x>|b + f(x)> to construct matrix,
+            # where row = (x << 1) ^ b and col = row ^ f(x)
+            rows = np.arange(2 ** (self.n + 1))
+            U_f[rows, rows ^ table[rows >> 1]] = 1
+
+            self.uf = backends.operator(U_f)
 
         self.circuit.append(self.uf, qubits[::-1])
@@ -1,33 +1,226 @@
 #!/usr/bin/env python3
 
-import subprocess
-from difflib import SequenceMatcher
-
-files = [
-    "bernstein_vazirani.py",
-    "deutsch_jozsa.py",
-    "grover.py",
-    "simon.py"
-]
-
-names = ['bv', 'dj', 'gr', 'si']
-
-for i, file1 in enumerate(files):
-    f1 = open(file1).read().replace('\n', '')
-    for j in range(i, 4):
-        if i != j:
-            file2 = files[j]
-            f2 = open(file2).read().replace('\n', '')
-            ratio = SequenceMatcher(None, f1, f2).quick_ratio()
-            print(f"{names[i]}/{names[j]} : {ratio*100:.2f}%")
-
-"""
-awk 'a[$0]++' file1 file2 | sed -e '/^\s*$/d' | wc -l
-
-bv/dj: 86
-bv/gr: 74
-bv/si: 56
-dj/gr: 74
-dj/si: 55
-gr/si: 66
-"""
+import argparse
+import ast
+import io
+import os
+import tokenize
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+'''
+Near-duplicate detection across the algorithm implementations.
+
+Every function and method in every module under the given paths (by default
+the whole repository: the top-level qiskit modules and the pyquil/ tree) is
+turned into a set of token shingles, summarised by a MinHash signature and
+bucketed with LSH banding. Only units that share a bucket are compared, so
+the cost grows roughly linearly with the amount of code rather than with the
+number of pairs of files.
+
+Usage:
+    ./diff.py                      # both backends, default thresholds
+    ./diff.py pyquil --threshold 0.8
+'''
+
+# Mersenne prime for the universal hashes (products stay below 2^62)
+PRIME = (1 << 31) - 1
+
+# Tokens that don't contribute to similarity
+SKIPPED = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT,
+           tokenize.DEDENT, tokenize.ENCODING, tokenize.ENDMARKER}
+
+
+class Unit:
+    """
+    A function or method, the granularity at which code is compared.
+
+    Parameters
+    ----------
+    path : str
+        File the unit was found in.
+    name : str
+        Qualified name, e.g. 'Grover._apply_zf'.
+    start, end : int
+        First and last line of the unit.
+    tokens : [str]
+        Normalised tokens of the unit's source.
+    """
+
+    def __init__(self, path, name, start, end, tokens):
+        self.path = path
+        self.name = name
+        self.start = start
+        self.end = end
+        self.tokens = tokens
+        self.signature = None
+
+    def __str__(self):
+        return f"{self.path}:{self.start}-{self.end} {self.name}"
+
+
+def find_modules(paths):
+    """
+    Every .py file under the given files or directories, in a stable order.
+    """
+    modules = []
+    for path in paths:
+        if os.path.isfile(path):
+            modules.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '__')))
+            modules += [os.path.join(root, f) for f in sorted(files) if f.endswith('.py')]
+    return sorted(set(os.path.relpath(m) for m in modules))
+
+
+def normalise(source):
+    """
+    Tokenise source, dropping comments/layout and replacing literals by their kind.
+    """
+    tokens = []
+    for tok in tokenize.generate_tokens(io.StringIO(source).readline):
+        if tok.type in SKIPPED:
+            continue
+        elif tok.type == tokenize.STRING:
+            tokens.append('<str>')
+        elif tok.type == tokenize.NUMBER:
+            tokens.append('<num>')
+        else:
+            tokens.append(tok.string)
+    return tokens
+
+
+def extract_units(path):
+    """
+    Split a module into Units, one per function or method.
+    """
+    with open(path) as file:
+        source = file.read()
+    lines = source.splitlines(keepends=True)
+
+    units = []
+
+    def visit(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                segment = ''.join(lines[child.lineno - 1:child.end_lineno])
+                units.append(Unit(path, prefix + child.name, child.lineno, child.end_lineno,
+                                  normalise(_dedent(segment))))
+                visit(child, prefix + child.name + '.')
+            elif isinstance(child, ast.ClassDef):
+                visit(child, prefix + child.name + '.')
+
+    visit(ast.parse(source, filename=path), '')
+    return units
+
+
+def _dedent(segment):
+    # Methods are indented; tokenize needs the first line at column 0
+    indent = len(segment) - len(segment.lstrip(' \t'))
+    return ''.join(line[indent:] if line[:indent].isspace() else line.lstrip()
+                   for line in segment.splitlines(keepends=True))
+
+
+def shingles(tokens, k):
+    """
+    Hashes of every run of k consecutive tokens (the whole unit if shorter).
+    """
+    if len(tokens) <= k:
+        runs = [tokens]
+    else:
+        runs = (tokens[i:i + k] for i in range(len(tokens) - k + 1))
+    return np.unique(np.fromiter((zlib.crc32('\x00'.join(run).encode()) & PRIME for run in runs),
+                                 dtype=np.int64))
+
+
+def minhash(hashes, a, b):
+    """
+    MinHash signature: the minimum of each universal hash over the shingle set.
+    """
+    return ((a[:, None] * hashes[None, :] + b[:, None]) % PRIME).min(axis=1)
+
+
+def candidate_pairs(units, bands):
+    """
+    Pairs of units whose signatures agree on at least one whole band.
+    """
+    rows = len(units[0].signature) // bands
+    buckets = defaultdict(list)
+    for i, unit in enumerate(units):
+        for band in range(bands):
+            key = unit.signature[band * rows:(band + 1) * rows].tobytes()
+            buckets[band, key].append(i)
+
+    pairs = set()
+    for members in buckets.values():
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                pairs.add((members[x], members[y]))
+    return pairs
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate functions across backends.")
+    parser.add_argument('paths', nargs='*', default=[here],
+                        help="files or directories to scan (default: the repository)")
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help="minimum estimated Jaccard similarity to report")
+    parser.add_argument('--shingle', type=int, default=5, help="tokens per shingle")
+    parser.add_argument('--permutations', type=int, default=128, help="MinHash signature length")
+    parser.add_argument('--bands', type=int, default=32, help="LSH bands (must divide permutations)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.permutations % args.bands:
+        parser.error("--bands must divide --permutations")
+
+    units = [unit for path in find_modules(args.paths) for unit in extract_units(path)]
+    if not units:
+        return
+
+    rng = np.random.default_rng(args.seed)
+    a = rng.integers(1, PRIME, size=args.permutations, dtype=np.int64)
+    b = rng.integers(0, PRIME, size=args.permutations, dtype=np.int64)
+    for unit in units:
+        unit.signature = minhash(shingles(unit.tokens, args.shingle), a, b)
+
+    matches = []
+    for i, j in candidate_pairs(units, args.bands):
+        u1, u2 = units[i], units[j]
+        if u1.path == u2.path and u1.start <= u2.end and u2.start <= u1.end:
+            # A nested function and its parent
+            continue
+        similarity = np.mean(units[i].signature == units[j].signature)
+        if similarity >= args.threshold:
+            matches.append((similarity, units[i], units[j]))
+
+    # Report matched regions, most similar first
+    matches.sort(key=lambda m: (-m[0], str(m[1]), str(m[2])))
+    for similarity, u1, u2 in matches:
+        print(f"{similarity * 100:6.2f}%  {u1}  ~  {u2}")
+
+    # Summarise drift per pair of files: share of each file's units with a match
+    matched = defaultdict(set)
+    for _, u1, u2 in matches:
+        if u1.path != u2.path:
+            key = tuple(sorted((u1.path, u2.path)))
+            matched[key].update((u1, u2))
+
+    counts = defaultdict(int)
+    for unit in units:
+        counts[unit.path] += 1
+
+    if matched:
+        print()
+    for (p1, p2), both in sorted(matched.items()):
+        total = counts[p1] + counts[p2]
+        print(f"{p1}/{p2} : {len(both)}/{total} units matched ({len(both) / total * 100:.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+import zlib
+
+import numpy as np
+import oracle
+
+'''
+Seeded random oracles for benchmarks and sweeps at any n.
+
+Each generator builds the whole truth table with vectorised numpy, so even
+n = 24 takes about a second, and returns it as an oracle.TableOracle
+(callable like any f, tabulated without calling it) together with the
+answer the algorithm should give. The answers come from the construction
+(the chosen a, b, s or marked inputs), so they are exact without running
+the classical solvers.
+
+seed is anything np.random.default_rng accepts: None, an int, a sequence
+of ints or a Generator. case() derives every case's seed from one seed
+and the case's position, so a case is the same whichever others are
+generated alongside it.
+'''
+
+
+def parity(values):
+    """
+    Parity of the set bits of each of an array of non-negative ints.
+    """
+    values = np.array(values, dtype=np.uint64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        values ^= values >> np.uint64(shift)
+    return (values & np.uint64(1)).astype(np.uint8)
+
+
+def deutsch_jozsa(n, balanced, seed=None):
+    """
+    A random constant or balanced oracle.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    balanced : bool
+        If True, f is 1 on a random half of the inputs. Otherwise f is a
+        random constant.
+    seed : int or np.random.Generator
+        Seed for the choice of f.
+
+    Returns
+    -------
+    result : (oracle.TableOracle, int)
+        f, and 1 if it is constant or 0 if it is balanced.
+
+    """
+    rng = np.random.default_rng(seed)
+    size = 2 ** n
+    if not balanced:
+        return oracle.TableOracle(np.full(size, rng.integers(2), dtype=np.uint8)), 1
+    if n == 0:
+        raise ValueError("A balanced f needs n >= 1")
+
+    table = np.zeros(size, dtype=np.uint8)
+    table[rng.choice(size, size // 2, replace=False)] = 1
+    return oracle.TableOracle(table), 0
+
+
+def bernstein_vazirani(n, seed=None):
+    """
+    f(x) = a·x + b for a random a and b.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    seed : int or np.random.Generator
+        Seed for the choice of a and b.
+
+    Returns
+    -------
+    result : (oracle.TableOracle, (int, int))
+        f, and (a, b).
+
+    """
+    rng = np.random.default_rng(seed)
+    a = int(rng.integers(2 ** n))
+    b = int(rng.integers(2))
+
+    table = parity(np.arange(2 ** n, dtype=np.uint64) & np.uint64(a)) ^ np.uint8(b)
+    return oracle.TableOracle(table), (a, b)
+
+
+def simon(n, s, seed=None):
+    """
+    A random f with f(x) = f(y) iff x + y in {0, s}.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    s : int
+        The hidden string. 0 gives a random permutation, otherwise f is
+        2-to-1 with random distinct values on the pairs {x, x + s}.
+    seed : int or np.random.Generator
+        Seed for the values of f.
+
+    Returns
+    -------
+    result : (oracle.TableOracle, int)
+        f, and s.
+
+    """
+    rng = np.random.default_rng(seed)
+    size = 2 ** n
+    if not 0 <= s < size:
+        raise ValueError(f"s must be in [0, 2^{n})")
+    if s == 0:
+        return oracle.TableOracle(rng.permutation(size)), 0
+
+    # Pair x with x + s and name each pair by its member with the top bit of
+    # s clear, with that bit deleted, numbering the pairs 0 .. 2^(n-1) - 1
+    top = s.bit_length() - 1
+    xs = np.arange(size, dtype=np.int64)
+    xs = np.where((xs >> top) & 1, xs ^ s, xs)
+    pairs = ((xs >> (top + 1)) << top) | (xs & ((1 << top) - 1))
+
+    values = rng.choice(size, size // 2, replace=False)
+    return oracle.TableOracle(values[pairs]), s
+
+
+def grover(n, marked=1, seed=None):
+    """
+    f(x) = 1 on a random set of marked inputs.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    marked : int
+        Number of inputs with f(x) = 1.
+    seed : int or np.random.Generator
+        Seed for the choice of inputs.
+
+    Returns
+    -------
+    result : (oracle.TableOracle, int)
+        f, and 1 if some x has f(x) = 1 or 0 otherwise.
+
+    """
+    rng = np.random.default_rng(seed)
+    size = 2 ** n
+    if not 0 <= marked <= size:
+        raise ValueError(f"marked must be in [0, 2^{n}]")
+
+    table = np.zeros(size, dtype=np.uint8)
+    table[rng.choice(size, marked, replace=False)] = 1
+    return oracle.TableOracle(table), int(marked > 0)
+
+
+# Cases generated per n by case() and suite()
+CASES_PER_N = 2
+
+
+def case(algorithm, n, index, seed=0):
+    """
+    One generated test case.
+
+    Parameters
+    ----------
+    algorithm : str
+        'simon', 'grover', 'dj' or 'bv', as in main.ALGORITHMS.
+    n : int
+        The length of bit string input to f.
+    index : int
+        Which of the CASES_PER_N cases for n: 0 is balanced (dj), has a
+        marked input (grover) or has s != 0 (simon); 1 is constant, has none
+        or is one-to-one. Both are random for bv.
+    seed : int
+        Seed the case's own seed is derived from.
+
+    Returns
+    -------
+    result : ((int, oracle.TableOracle), expected)
+        A test case in the format of main.suites().
+
+    """
+    # Stable across processes, unlike hash()
+    case_seed = [seed, zlib.crc32(algorithm.encode()), n, index]
+    if algorithm == 'dj':
+        f, expected = deutsch_jozsa(n, balanced=index == 0 and n > 0, seed=case_seed)
+    elif algorithm == 'bv':
+        f, expected = bernstein_vazirani(n, seed=case_seed)
+    elif algorithm == 'grover':
+        f, expected = grover(n, marked=int(index == 0), seed=case_seed)
+    elif algorithm == 'simon':
+        rng = np.random.default_rng(case_seed)
+        s = int(rng.integers(1, 2 ** n)) if index == 0 and n > 0 else 0
+        f, expected = simon(n, s, seed=rng)
+    else:
+        raise ValueError(f"Unknown algorithm '{algorithm}'")
+    return (n, f), expected
+
+
+def suite(algorithm, ns, seed=0):
+    """
+    Generated test cases for one algorithm, CASES_PER_N per n in increasing n.
+    """
+    return [case(algorithm, n, index, seed) for n in sorted(ns) for index in range(CASES_PER_N)]
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+'''
+Linear algebra over GF(2) for the classical piece of Simon.
+
+Vectors in {0,1}^n are represented as ints, the same way the rest of the
+repo represents bitstrings.
+'''
+
+
+class Basis:
+    """
+    Incremental basis for a set of GF(2) equations.
+
+    Parameters
+    ----------
+    n : int
+        The length of each equation, as a bitstring {0,1}^n.
+
+    Examples
+    ----------
+    ```
+    >>> basis = Basis(3)
+    >>> basis.add(0b011), basis.add(0b001), basis.add(0b010)
+    (True, True, False)
+    >>> basis.solve()
+    4
+    ```
+    """
+
+    def __init__(self, n):
+        self.n = n
+
+        # Maps the leading bit of each row to the row itself
+        self.rows = {}
+
+    @property
+    def rank(self):
+        return len(self.rows)
+
+    def add(self, eqn):
+        """
+        Fold an equation into the basis.
+
+        Parameters
+        ----------
+        eqn : int
+            Equation of form {0,1}^n.
+
+        Returns
+        -------
+        result : bool
+            True if the equation was linearly independent of the basis.
+
+        """
+        for bit in reversed(range(self.n)):
+            if not (eqn >> bit) & 1:
+                continue
+            if bit not in self.rows:
+                self.rows[bit] = eqn
+                return True
+            eqn ^= self.rows[bit]
+        return False
+
+    def solve(self):
+        """
+        Find the smallest nonzero t in {0,1}^n with e·t = 0 for every equation e.
+
+        Returns
+        -------
+        result : int
+            Smallest nonzero solution, or 0 if only the trivial solution exists.
+
+        """
+        # Reduce rows so each leading bit appears in exactly one row
+        rows = dict(self.rows)
+        for pivot in sorted(rows):
+            for other in rows:
+                if other != pivot and (rows[other] >> pivot) & 1:
+                    rows[other] ^= rows[pivot]
+
+        # Every free bit gives one vector of the null space
+        null_space = Basis(self.n)
+        for free in range(self.n):
+            if free in rows:
+                continue
+            t = 1 << free
+            for pivot, row in rows.items():
+                if (row >> free) & 1:
+                    t |= 1 << pivot
+            null_space.add(t)
+
+        if null_space.rank == 0:
+            return 0
+
+        # Any combination involving a row with a higher leading bit is larger,
+        # so the row with the lowest leading bit is the smallest solution
+        return null_space.rows[min(null_space.rows)]
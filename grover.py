@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
 
+import backends
+import classical
+import cnf
+import multiprocessing
 import numpy as np
-from qiskit import *
-from qiskit.quantum_info.operators import Operator
+import oracle
+import outofcore
+import policy
+import resources
+
+
+def _cnf_ancillas(formula):
+    # A scratch ancilla and a counter that holds 0..m violated clauses
+    if not formula.clauses or any(not clause for clause in formula.clauses):
+        return 0
+    return 1 + len(formula.clauses).bit_length()
 
 
 class Grover:
@@ -13,13 +26,31 @@ class Grover:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda, oracle.TruthTable or cnf.CNF
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}.
+        A CNF formula is synthesised into Z_f gate by gate, with
+        1 + bit_length(m) ancilla qubits for m clauses, and is never
+        tabulated.
     max_iterations : int
         The number of iterations to re-run if the x found
         from running doesn't have f(x) = 1. We decide that f doesn't
         have an x s.t. f(x) = 1 if we reach this number of iterations.
+    mode : str
+        'circuit' simulates the circuit on Aer. 'classical' solves from the
+        truth table of f with classical.py instead, as a baseline.
+        'out_of_core' simulates it with outofcore.py on a statevector in a
+        memory-mapped file, for n too large to hold one in RAM.
+    precision : str
+        'double' or 'single'. Single precision halves the memory Aer
+        uses for the statevector. Oracle matrices stay complex128 either
+        way, as qiskit and Aer only hold unitaries in double precision.
+    cache : cache.DistributionCache
+        If given, the distribution of x is looked up by truth table before
+        building anything, and run() samples from it.
+    budget : resources.Budget
+        Memory/time limits checked before construction. Defaults to
+        resources.default_budget.
 
     Examples
     ----------
@@ -28,25 +59,110 @@ class Grover:
     0
     >>> Grover(2, lambda x: x == 0b10).run()
     1
+    >>> grover = Grover(2, lambda x: 0)
+    >>> grover.mark([0b01])
+    >>> grover.run()
+    1
     ```
     """
 
-    def __init__(self, n, f, max_iterations=5):
+    def __init__(self, n, f, max_iterations=5, mode='circuit', precision='double', cache=None, budget=None):
+        if mode not in ('circuit', 'classical', 'out_of_core'):
+            raise ValueError(f"Unknown mode '{mode}'")
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+
+        self.formula = f if isinstance(f, cnf.CNF) and mode == 'circuit' else None
+        if self.formula is not None:
+            if self.formula.n != n:
+                raise ValueError(f"Formula has {self.formula.n} variables, not n = {n}")
+            # Nothing to look up without a truth table
+            cache = None
+
+        budget = resources.default_budget if budget is None else budget
+        self.cost = self.estimate(n, mode, precision, self.formula)
+        budget.check(self.cost)
+
         self.n = n
         self.f = f
-        self.iteration = 0
+        self.mode = mode
         self.max_iterations = max_iterations
+        self.precision = precision
+        self.cache = cache
 
+        self.table = None
+        self.circuit = None
+        self.distribution = None
+        self.state = None
         self.zf = None
         self.z0 = None
-        self.__construct()
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        elif self.mode == 'out_of_core':
+            self.__simulate()
+        elif self.cache is not None:
+            self.table = oracle.tabulate(self.n, self.f)
+            self.distribution = self.__cached_distribution()
+        else:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
+
+    @classmethod
+    def estimate(cls, n, mode='circuit', precision='double', formula=None):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'circuit', 'classical' or 'out_of_core'.
+        precision : str
+            'double' or 'single'.
+        formula : cnf.CNF
+            The oracle, if it is a CNF formula synthesised gate by gate.
+
+        Returns
+        -------
+        result : resources.Estimate
+
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+
+        k = int(np.floor(np.pi / 4 * np.sqrt(2 ** n)))
+
+        if mode == 'out_of_core':
+            # Fill, then a phase pass and two reflection passes per G, then the scan to measure
+            return outofcore.estimate(n, passes=2 + 3 * k, evaluations=2 ** n, precision=precision)
+
+        if formula is not None:
+            # Each clause is counted and uncounted, each time evaluated into the
+            # scratch ancilla (X on positive literals, an mcx, X) and uncomputed
+            # around an mcx per counter bit
+            bits = _cnf_ancillas(formula) - 1
+            clause_gates = sum(2 * (2 * (2 * sum(literal > 0 for literal in clause) + 1) + bits)
+                               for clause in formula.clauses)
+            # Z_f is the clause gates plus a Z controlled on the counter being 0;
+            # H Z_0 H is H, X, H, mcx, H, X, H
+            g_gates = clause_gates + 2 * bits + 3 + 2 * n + (2 * n + 3)
+            return resources.estimate_gates(
+                qubits=n + _cnf_ancillas(formula), gates=2 * n + k * g_gates, precision=precision)
+
+        # Z_f and Z_0 are both dense, built once and appended once per application of G
+        return resources.estimate_circuit(
+            qubits=n, oracle_qubits=n, oracle_appends=2 * k, oracle_matrices=2, oracle_copies=2,
+            gates=n + k * (2 + 2 * n) + n, evaluations=2 ** n, precision=precision)
 
     def __construct(self):
         """
         Construct program for Grover's algorithm.
         """
-        # Create a Quantum circuit with n qubits and n classical bits for measurement
-        self.circuit = QuantumCircuit(self.n, self.n)
+        # Create a Quantum circuit with n qubits (plus the ancillas of a CNF
+        # oracle) and n classical bits for measurement
+        ancillas = 0 if self.formula is None else _cnf_ancillas(self.formula)
+        self.circuit = backends.quantum_circuit(self.n + ancillas, self.n)
 
         # Apply Hadamard to all qubits
         for q in range(self.n):
@@ -62,34 +178,135 @@ class Grover:
         for q in range(self.n):
             self.circuit.measure(q, q)
 
-    def run(self):
+    def run(self, shots=None, seed=None):
         """
         Run Grover's algorithm.
 
+        The instance isn't changed (only flip() changes it), so run() can be
+        called again, or from several threads at once.
+
+        Parameters
+        ----------
+        shots : int
+            Number of candidate x to measure and verify. Defaults to
+            max_iterations + 1, a first try and one re-run per iteration.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         -------
         result : int
             Return 1 if there exists x in [0,1] such that f(x) = 1, and 0 otherwise.
 
         """
-        simulator = Aer.get_backend('qasm_simulator')
-        job = execute(self.circuit, simulator, shots=1)
-        result = job.result()
-        counts = result.get_counts(self.circuit)
-        measurement = list(counts.keys())[0]
+        if self.mode == 'classical':
+            return classical.grover(self.table)
+
+        # All candidates are measured at once rather than re-running for each
+        shots = self.max_iterations + 1 if shots is None else shots
+        if self.distribution is not None:
+            xs = np.random.default_rng(seed).choice(2 ** self.n, size=shots, p=self.distribution)
+        elif self.state is not None:
+            xs = self.state.sample(shots, seed)
+        else:
+            job = backends.execute(self.circuit, shots=shots, precision=self.precision, seed=seed,
+                                   **policy.current.simulator_options(self.cost.qubits))
+            result = job.result()
+            counts = result.get_counts(self.circuit)
+
+            # Convert measurements into int inputs for f
+            xs = [int(measurement[::-1], 2) for measurement in counts]
+
+        # Verify each distinct candidate on the oracle (as tabulated, including flips)
+        for x in np.unique(xs):
+            if (self.f(int(x)) if self.table is None else self.table[x]) == 1:
+                return 1
+        return 0
+
+    def flip(self, xs):
+        """
+        Flip f(x) for each x in xs without rebuilding the instance.
 
-        # Convert measurement into int input for f
-        x = int(measurement[::-1], 2)
+        Z_f is patched in place in O(len(xs)); the next run() uses the new
+        marked set. With a cache, the distribution for the new truth table is
+        looked up (and simulated on a miss). Not safe to call while run() is
+        executing on another thread.
 
-        # Verify output on oracle, if f(x) == 1, we're done
-        # Else we re-run if we've got more iterations left
-        if self.f(x) == 1:
-            return 1
-        elif self.iteration < self.max_iterations:
-            self.iteration += 1
-            return self.run()
-        else:
-            return 0
+        Parameters
+        ----------
+        xs : [int]
+            Inputs whose output to flip. An input listed twice is flipped twice.
+
+        """
+        self.__require_table()
+
+        xs, counts = np.unique(np.asarray(xs, dtype=np.int64), return_counts=True)
+        xs = xs[counts % 2 == 1]
+
+        self.table[xs] ^= 1
+
+        if self.zf is not None:
+            # Z_f is diagonal and indexed by x. Every application in the
+            # circuit is this one instruction (test_grover.py checks that
+            # append doesn't copy it); drop any synthesized definition
+            self.zf.params[0][xs, xs] *= -1
+            self.zf.definition = None
+
+        if self.cache is not None:
+            self.distribution = self.__cached_distribution()
+
+    def mark(self, xs):
+        """
+        Set f(x) = 1 for each x in xs.
+        """
+        self.__require_table()
+        xs = np.unique(np.asarray(xs, dtype=np.int64))
+        self.flip(xs[self.table[xs] != 1])
+
+    def unmark(self, xs):
+        """
+        Set f(x) = 0 for each x in xs.
+        """
+        self.__require_table()
+        xs = np.unique(np.asarray(xs, dtype=np.int64))
+        self.flip(xs[self.table[xs] != 0])
+
+    def __require_table(self):
+        # CNF and out_of_core instances never tabulate f, so there's nothing to patch
+        if self.table is None:
+            raise ValueError("Can't flip entries of an oracle that isn't tabulated")
+
+    def __simulate(self):
+        """
+        Simulate the circuit out of core, up to measurement.
+        """
+        marks = outofcore.marks(self.n, self.f)
+        self.state = outofcore.Statevector(self.n, self.precision)
+
+        # H on |0...0> gives the uniform superposition
+        self.state.fill(2 ** (-self.n / 2))
+
+        # G = -H × Z_0 × H × Z_f, the first three being reflection about the mean
+        k = int(np.floor(np.pi / 4 * np.sqrt(2 ** self.n)))
+        for _ in range(k):
+            self.state.phase(marks)
+            self.state.reflect()
+
+    def __cached_distribution(self):
+        """
+        Look up the distribution of x for the current table, simulating it on a miss.
+        """
+        key = self.cache.key('grover', self.n, self.table, self.precision)
+        distribution = self.cache.get(key)
+        if distribution is None:
+            with policy.current.blas_limit(self.cost.qubits):
+                if self.circuit is None:
+                    self.__construct()
+                distribution = backends.probabilities(
+                    self.circuit, range(self.n), precision=self.precision,
+                    **policy.current.simulator_options(self.cost.qubits))
+            self.cache.put(key, distribution)
+        return distribution
 
     def __apply_g(self, qubits, k):
         """
@@ -106,12 +323,18 @@ class Grover:
         """
         # Apply G to qubits k times
         for _ in range(k):
-            self.__apply_zf(qubits)
+            if self.formula is None:
+                self.__apply_zf(qubits)
+            else:
+                self.__apply_cnf_zf(qubits)
 
             for q in qubits:
                 self.circuit.h(q)
 
-            self.__apply_z0(qubits)
+            if self.formula is None:
+                self.__apply_z0(qubits)
+            else:
+                self.__apply_gate_z0(qubits)
 
             for q in qubits:
                 self.circuit.h(q)
@@ -128,20 +351,117 @@ class Grover:
         """
 
         if self.zf is None:
+            if self.table is None:
+                self.table = oracle.tabulate(self.n, self.f)
+
             # Initializes Z_f as a 2^n by 2^n matrix of zeros
-            Z_f = np.eye(2 ** self.n, dtype=int)
+            Z_f = np.eye(2 ** self.n, dtype=np.int8)
 
             # Apply definition of Z_f = (-1)^{f(x)} to construct matrix
-            for x in range(2 ** self.n):
-                Z_f[x][x] = (-1) ** self.f(x)
+            np.fill_diagonal(Z_f, 1 - 2 * (self.table.astype(np.int8) & 1))
 
             # Multiply by -1 to account for leading minus in G
             Z_f *= -1
 
-            self.zf = Operator(Z_f)
+            # A single instruction shared by every application, so flip() can patch it in place
+            self.zf = backends.operator(Z_f).to_instruction()
 
         self.circuit.append(self.zf, qubits[::-1])
 
+    def __apply_cnf_zf(self, qubits):
+        """
+        Applies Z_f for a CNF oracle (up to global phase) gate by gate.
+
+        A counter register counts the violated clauses: each clause in turn
+        is evaluated into a scratch ancilla, which increments the counter
+        and is then uncomputed. Z flips the phase where the count is 0, and
+        the counting is undone in reverse. The ancillas are reused for every
+        clause, so a formula of m clauses needs 1 + bit_length(m) of them.
+
+        Parameters
+        ----------
+        qubits : [int]
+            Qubits to apply Z_f to, qubits[0] holding the top bit of x.
+
+        """
+        clauses = self.formula.clauses
+        if any(not clause for clause in clauses):
+            # An empty clause never holds, so f = 0 and Z_f is the identity
+            return
+        if not clauses:
+            # f = 1 everywhere, so Z_f is a global phase
+            return
+
+        # Variable v is bit v - 1 of x
+        def qubit(literal):
+            return qubits[self.n - abs(literal)]
+
+        # The scratch ancilla, then the counter, least significant bit first
+        scratch = self.n
+        counter = list(range(self.n + 1, self.n + _cnf_ancillas(self.formula)))
+
+        def evaluate(clause):
+            # Sets (or clears again) the scratch ancilla if every literal is
+            # false, i.e. the clause is violated
+            positive = [qubit(literal) for literal in clause if literal > 0]
+            for q in positive:
+                self.circuit.x(q)
+            self.circuit.mcx([qubit(literal) for literal in clause], scratch)
+            for q in positive:
+                self.circuit.x(q)
+
+        def count(clause, inverse=False):
+            # Add (or subtract) the scratch ancilla to the counter: bit j
+            # flips if the scratch and every lower bit are set, top bit first
+            evaluate(clause)
+            bits = range(len(counter)) if inverse else reversed(range(len(counter)))
+            for j in bits:
+                self.circuit.mcx([scratch] + counter[:j], counter[j])
+            evaluate(clause)
+
+        for clause in clauses:
+            count(clause)
+
+        # Phase flip where no clause is violated. The counter has enough
+        # bits that it never wraps around to 0
+        for q in counter:
+            self.circuit.x(q)
+        if len(counter) == 1:
+            self.circuit.z(counter[0])
+        else:
+            self.circuit.h(counter[-1])
+            self.circuit.mcx(counter[:-1], counter[-1])
+            self.circuit.h(counter[-1])
+        for q in counter:
+            self.circuit.x(q)
+
+        for clause in reversed(clauses):
+            count(clause, inverse=True)
+
+    def __apply_gate_z0(self, qubits):
+        """
+        Applies Z_0 (up to global phase) gate by gate: a Z controlled on every
+        qubit being 0.
+
+        Parameters
+        ----------
+        qubits : [int]
+            Qubits to apply Z_0 to.
+
+        """
+        for q in qubits:
+            self.circuit.x(q)
+
+        if len(qubits) == 1:
+            self.circuit.z(qubits[0])
+        else:
+            self.circuit.h(qubits[-1])
+            self.circuit.mcx(qubits[:-1], qubits[-1])
+            self.circuit.h(qubits[-1])
+
+        for q in qubits:
+            self.circuit.x(q)
+
     def __apply_z0(self, qubits):
         """
         Defines Z_0 gate (if not defined) and applies it to qubits.
@@ -155,8 +475,250 @@ class Grover:
 
         if self.z0 is None:
             # Create Z_0 as identity, except with -1 in top-left corner
-            Z_0 = np.eye(2 ** self.n)
+            Z_0 = np.eye(2 ** self.n, dtype=np.int8)
             Z_0[0][0] = -1
-            self.z0 = Operator(Z_0)
+            self.z0 = backends.operator(Z_0).to_instruction()
 
         self.circuit.append(self.z0, qubits[::-1])
+
+
+def _search_partition(args):
+    """
+    Run one search of a PartitionedGrover in a pool worker.
+    """
+    execution_policy, n, table, max_iterations, precision, shots, seed = args
+    policy.set_policy(execution_policy)
+
+    # The searches were admitted together, so don't check each again
+    search = Grover(n, table, max_iterations=max_iterations, precision=precision,
+                    budget=resources.Budget())
+    return search.run(shots, seed)
+
+
+class PartitionedGrover:
+    """
+    Grover's algorithm split over the top bits of the input.
+
+    Fixing the top p bits of x to each of their 2^p values leaves 2^p
+    independent searches over the remaining n - p bits. Each is a Grover
+    instance of n - p qubits (with the iteration count for that size) on
+    its slice of the truth table, and they run on a pool of workers. f has
+    some x with f(x) = 1 iff one of the searches verifies one.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    f : lambda or oracle.TruthTable
+        A function that take as input an int in range [0, 2^n]
+        representing binary string {0,1}^n and outputs int {0,1}.
+    partition_bits : int
+        p, the number of top bits fixed per search, 0 <= p < n.
+    max_iterations : int
+        The number of re-runs of each search, as in Grover.
+    precision : str
+        'double' or 'single', as in Grover.
+    budget : resources.Budget
+        Memory/time limits checked before construction, for all searches
+        running at once. Defaults to resources.default_budget.
+
+    Examples
+    ----------
+    ```
+    >>> PartitionedGrover(4, lambda x: x == 0b1101, partition_bits=2).run()
+    1
+    ```
+    """
+
+    def __init__(self, n, f, partition_bits=1, max_iterations=5, precision='double', budget=None):
+        if not 0 <= partition_bits < n:
+            raise ValueError(f"partition_bits must be in [0, {n})")
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+
+        budget = resources.default_budget if budget is None else budget
+        self.cost = self.estimate(n, partition_bits, precision)
+        budget.check(self.cost)
+
+        self.n = n
+        self.f = f
+        self.partition_bits = partition_bits
+        self.max_iterations = max_iterations
+        self.precision = precision
+
+        self.table = oracle.tabulate(self.n, self.f)
+
+    @classmethod
+    def workers(cls, n, partition_bits):
+        """
+        Number of searches run at once, as policy.current splits the cores.
+        """
+        workers, _ = policy.current.split(n - partition_bits)
+        return min(workers, 2 ** partition_bits)
+
+    @classmethod
+    def estimate(cls, n, partition_bits=1, precision='double'):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        partition_bits : int
+            The number of top bits fixed per search.
+        precision : str
+            'double' or 'single'.
+
+        Returns
+        -------
+        result : resources.Estimate
+            Memory of all concurrent searches, and wall time of all 2^p.
+
+        """
+        search = Grover.estimate(n - partition_bits, precision=precision)
+        workers = cls.workers(n, partition_bits)
+        rounds = -(-2 ** partition_bits // workers)
+
+        return resources.Estimate(
+            search.qubits, workers * search.matrix_bytes, workers * search.simulator_bytes + 2 ** n * 8,
+            2 ** partition_bits * search.gates, rounds * search.seconds + 2 ** n / resources.CALLS_PER_SECOND)
+
+    def run(self, shots=None, seed=None):
+        """
+        Run every search, stopping at the first that verifies an x.
+
+        Parameters
+        ----------
+        shots : int
+            Candidates measured per search, as in Grover.run.
+        seed : int
+            Seed the searches' own seeds are derived from, for reproducible runs.
+
+        Returns
+        -------
+        result : int
+            Return 1 if there exists x in [0,1] such that f(x) = 1, and 0 otherwise.
+
+        """
+        m = self.n - self.partition_bits
+        count = 2 ** self.partition_bits
+        seeds = [None] * count if seed is None else np.random.SeedSequence(seed).generate_state(count).tolist()
+        searches = [(policy.current, m, self.table[prefix << m:(prefix + 1) << m],
+                     self.max_iterations, self.precision, shots, seeds[prefix])
+                    for prefix in range(count)]
+
+        # Pool workers are daemonic and can't start a pool of their own
+        workers = self.workers(self.n, self.partition_bits)
+        if workers == 1 or multiprocessing.current_process().daemon:
+            return int(any(_search_partition(search) for search in searches))
+
+        with policy.pool_context().Pool(workers) as pool:
+            # Leaving the block terminates the searches still running
+            return int(any(pool.imap_unordered(_search_partition, searches)))
+
+
+class GroverBatch:
+    """
+    Grover's algorithm over many oracles of the same n at once.
+
+    All states are held in one (batch, 2^n) array. Each application of G is
+    a row-wise sign flip by that row's Z_f followed by one vectorised
+    -H × Z_0 × H, which is reflection about the mean of each row.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to each f.
+    fs : [lambda or oracle.TruthTable] or np.ndarray
+        The oracles, or a (batch, 2^n) array of their truth tables.
+    max_iterations : int
+        The number of re-samples per oracle if the x found doesn't have
+        f(x) = 1, as in Grover.
+    precision : str
+        'double' or 'single' amplitudes.
+
+    Examples
+    ----------
+    ```
+    >>> GroverBatch(2, [lambda x: 0, lambda x: x == 0b10]).run()
+    array([0, 1])
+    ```
+    """
+
+    def __init__(self, n, fs, max_iterations=5, precision='double'):
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+
+        self.n = n
+        self.max_iterations = max_iterations
+        self.precision = precision
+
+        if isinstance(fs, np.ndarray):
+            self.tables = np.atleast_2d(fs)
+        else:
+            self.tables = np.stack([oracle.tabulate(n, f) for f in fs])
+        if self.tables.shape[-1] != 2 ** n:
+            raise ValueError(f"Truth tables must have 2^{n} entries")
+
+        self.probabilities = None
+        self.__simulate()
+
+    def __simulate(self):
+        """
+        Evolve every state through k applications of G and keep the probabilities.
+        """
+        size = 2 ** self.n
+        dtype = np.float64 if self.precision == 'double' else np.float32
+
+        # H on |0...0> gives the uniform superposition in every row
+        state = np.full(self.tables.shape, 1 / np.sqrt(size), dtype=dtype)
+
+        # Z_f (with the leading minus of G) as a sign per entry
+        signs = np.where(self.tables == 1, 1, -1).astype(dtype)
+
+        k = int(np.floor(np.pi / 4 * np.sqrt(size)))
+        for _ in range(k):
+            state *= signs
+
+            # H × Z_0 × H reflects about the uniform state: psi -> 2 mean(psi) - psi
+            mean = state.mean(axis=1, keepdims=True)
+            state *= -1
+            state += 2 * mean
+
+        np.square(state, out=state)
+        self.probabilities = state
+
+    def run(self, shots=None, seed=None):
+        """
+        Sample every oracle's state and verify on its truth table.
+
+        Parameters
+        ----------
+        shots : int
+            Candidates sampled per oracle. Defaults to max_iterations + 1.
+        seed : int
+            Seed for the samples, for reproducible runs.
+
+        Returns
+        -------
+        result : np.ndarray
+            1 for each oracle where some sampled x has f(x) = 1, and 0 otherwise.
+
+        """
+        batch = len(self.probabilities)
+        shots = self.max_iterations + 1 if shots is None else shots
+
+        # Each row's CDF ends at exactly 1, so every u in [0, 1) lands on an x
+        # of that row with nonzero probability
+        cdf = np.cumsum(self.probabilities, axis=1, dtype=np.float64)
+        cdf /= cdf[:, -1:]
+        cdf[:, -1] = 1
+
+        u = np.random.default_rng(seed).random((batch, shots))
+        xs = np.empty((batch, shots), dtype=np.int64)
+        for row in range(batch):
+            xs[row] = np.searchsorted(cdf[row], u[row], side='right')
+
+        rows = np.arange(batch)[:, None]
+        return (self.tables[rows, xs] == 1).any(axis=1).astype(int)
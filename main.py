@@ -1,33 +1,125 @@
 #!/usr/bin/env python3
 
 
-import bernstein_vazirani
-import deutsch_jozsa
-import grover
-import simon
+import argparse
+import classical
+import contextlib
+import csv
+import generators
+import importlib
+import importlib.util
+import json
+import oracle
+import os
+import policy
+import sys
 import time
+import types
+import zlib
 
 
-def test_algorithm(tests, algorithm, verbose=True):
+def run_case(algorithm, test_input, options):
+    start_compile = time.time()
+    instance = algorithm(*test_input, **options)
+    end_compile = time.time()
+
+    start_run = time.time()
+    output = instance.run()
+    end_run = time.time()
+
+    return output, end_compile - start_compile, end_run - start_run
+
+
+def _load_module(module_name, path):
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _import_algorithm(module_name, path, class_name):
+    """
+    An algorithm class from its module, loading the module from path under
+    module_name if it hasn't been imported.
+    """
+    module = sys.modules.get(module_name)
+    if module is None:
+        # pyquil/ modules import its _root, which is only on sys.path when
+        # they're run as scripts
+        root = os.path.join(os.path.dirname(path), '_root.py')
+        if '_root' not in sys.modules and os.path.exists(root):
+            _load_module('_root', root)
+        module = _load_module(module_name, path)
+    return getattr(module, class_name)
+
+
+def _portable(test_input):
+    """
+    A test input that can be pickled to a pool worker: Python functions
+    (lambdas in particular) are replaced by their tabulated truth table.
+    """
+    n, f = test_input
+    if isinstance(f, types.FunctionType):
+        f = oracle.TableOracle(oracle.tabulate(n, f))
+    return n, f
+
+
+def _run_pooled_case(args):
+    execution_policy, source, test_input, options = args
+    policy.set_policy(execution_policy)
+    return run_case(_import_algorithm(*source), test_input, options)
+
+
+def run_cases(tests, algorithm, options, parallel=False):
+    """
+    Run each test case, yielding (output, compile time, run time) in order.
+
+    With parallel=True, consecutive cases that policy.current splits the same
+    way run concurrently on that many workers. Workers are started by
+    policy.pool_context(), so they are sent the algorithm's module and each
+    case, with Python oracles tabulated first (their evaluation then isn't
+    part of the timed construction).
+    """
+    if not parallel:
+        for test_input, _ in tests:
+            yield run_case(algorithm, test_input, options)
+        return
+
+    # Group consecutive cases by (workers, threads) for their size
+    groups = []
+    for index, (test_input, _) in enumerate(tests):
+        split = policy.current.split(algorithm.estimate(test_input[0], **options).qubits)
+        if groups and groups[-1][0] == split:
+            groups[-1][1].append(index)
+        else:
+            groups.append((split, [index]))
+
+    module = sys.modules[algorithm.__module__]
+    source = (module.__name__, module.__file__, algorithm.__name__)
+    for (workers, _), indices in groups:
+        if workers == 1:
+            for index in indices:
+                yield run_case(algorithm, tests[index][0], options)
+            continue
+        jobs = [(policy.current, source, _portable(tests[index][0]), options) for index in indices]
+        with policy.pool_context().Pool(workers) as pool:
+            yield from pool.imap(_run_pooled_case, jobs)
+
+
+def test_algorithm(tests, algorithm, verbose=True, parallel=False, **options):
     if verbose:
-        print(f"\nTests for {algorithm.__name__}\n" + '-' * 70)
+        mode = f" ({options['mode']})" if 'mode' in options else ''
+        print(f"\nTests for {algorithm.__name__}{mode}\n" + '-' * 70)
         print("n\ttotal (s)\tcompile (s)\truntime (s)\toutput\n" + '-' * 70)
 
     passed = 0
     total_compile_time = 0
     total_run_time = 0
 
-    for (test_num, (test_input, test_output)) in enumerate(tests):
-        start_compile = time.time()
-        instance = algorithm(*test_input)
-        end_compile = time.time()
-        elapsed_compile = end_compile - start_compile
+    results = list(run_cases(tests, algorithm, options, parallel))
+    for (test_input, test_output), (output, elapsed_compile, elapsed_run) in zip(tests, results):
         total_compile_time += elapsed_compile
-
-        start_run = time.time()
-        output = instance.run()
-        end_run = time.time()
-        elapsed_run = end_run - start_run
         total_run_time += elapsed_run
 
         if verbose:
@@ -42,16 +134,73 @@ def test_algorithm(tests, algorithm, verbose=True):
     print('-' * 70 +
           f"\nTotal:\t{total_compile_time+total_run_time:.4f}\t\t{total_compile_time:.4f}\t\t{total_run_time:.4f}\t\tPassed {passed}/{len(tests)}")
 
+    return results
 
-if __name__ == "__main__":
-    # Test case format: ((n, oracle), expected_output)
 
-    #function design: given x and s, deduce y s.t. x+y=s. Return min(x, y)
-    #return a bitstring y, the same size as x
-    def simon_fn(x, s):
-        y = x ^ s #x ^ y = s <==> x ^ s = y
-        return min(x, y)
+# Algorithm name -> (module, class), the module living at the top level for
+# qiskit (and the classical baselines) and under pyquil/ for pyquil
+ALGORITHMS = {
+    'simon': ('simon', 'Simon'),
+    'grover': ('grover', 'Grover'),
+    'dj': ('deutsch_jozsa', 'DeutschJozsa'),
+    'bv': ('bernstein_vazirani', 'BernsteinVazirani'),
+}
 
+BACKENDS = ['qiskit', 'pyquil', 'classical', 'out_of_core']
+
+# classical.py solver giving the ground truth for each algorithm
+SOLVERS = {'simon': 'simon', 'grover': 'grover', 'dj': 'deutsch_jozsa', 'bv': 'bernstein_vazirani'}
+
+# Simon measures 2n qubits entangled through U_f, which outofcore.py can't simulate
+OUT_OF_CORE = ['grover', 'dj', 'bv']
+
+
+def backend_options(backend, precision='double'):
+    """
+    Keyword arguments selecting backend for any algorithm class.
+    """
+    return {'qiskit': {'precision': precision}, 'pyquil': {}, 'classical': {'mode': 'classical'},
+            'out_of_core': {'mode': 'out_of_core', 'precision': precision}}[backend]
+
+
+def load_algorithm(name, backend='qiskit'):
+    """
+    Import only the module needed for one algorithm on one backend.
+    """
+    module_name, class_name = ALGORITHMS[name]
+    if backend in ('qiskit', 'classical', 'out_of_core'):
+        module = importlib.import_module(module_name)
+    else:
+        # pyquil/ isn't a package (it would shadow pyquil itself), load by path
+        here = os.path.dirname(os.path.abspath(__file__))
+        return _import_algorithm(f'pyquil_{module_name}', os.path.join(here, 'pyquil', module_name + '.py'),
+                                 class_name)
+    return getattr(module, class_name)
+
+
+#function design: given x and s, deduce y s.t. x+y=s. Return min(x, y)
+#return a bitstring y, the same size as x
+def simon_fn(x, s):
+    y = x ^ s #x ^ y = s <==> x ^ s = y
+    return min(x, y)
+
+
+#take integers as input, treat as binary strings and multiply
+#return 0 or 1
+def mult_bstrings(x, y):
+    return bin(x & y).count('1') % 2
+
+
+def suites():
+    """
+    The hand-written test suites.
+
+    Returns
+    -------
+    result : {str: [((int, lambda), expected)]}
+        Test cases for each algorithm, in ALGORITHMS order.
+
+    """
     simon_tests = [
         ((1, lambda x: [0b0, 0b1][x]), 0b0),
         ((2, lambda x: [0b11, 0b00, 0b11, 0b00][x]), 0b10),
@@ -69,8 +218,6 @@ if __name__ == "__main__":
         ((6, lambda x: simon_fn(x, 0b110000)), 0b110000)
     ]
 
-    test_algorithm(simon_tests, simon.Simon)
-
     grover_tests = [
         ((1, lambda x: int(x == 0b1)), 1),
         ((1, lambda x: 0), 0),
@@ -96,8 +243,6 @@ if __name__ == "__main__":
         ((10, lambda x: int(x == 0b1)), 1)
     ]
 
-    test_algorithm(grover_tests, grover.Grover)
-
     dj_tests = [
         ((1, lambda x: x % 2), 0),
         ((1, lambda x: 0), 1),
@@ -124,17 +269,6 @@ if __name__ == "__main__":
         ((11, lambda x: 0), 1)
     ]
 
-    test_algorithm(dj_tests, deutsch_jozsa.DeutschJozsa)
-
-
-    #take integers as input, treat as binary strings and multiply
-    #return 0 or 1
-    def mult_bstrings(x, y):
-        int_and = (x&y)
-        str_and = "{0:b}".format(int_and)
-        sum_and = sum([int(i) for i in str_and])
-        return sum_and %2
-
     bv_tests = [
         # output format: ("a", "b")
         ((1, lambda x: [0, 1][x]), (1, 0)),
@@ -165,4 +299,196 @@ if __name__ == "__main__":
         #((12, lambda x: mult_bstrings(0b1101 << 7, x)), (0b1101 << 8, 0))
     ]
 
-    test_algorithm(bv_tests, bernstein_vazirani.BernsteinVazirani)
+    return {'simon': simon_tests, 'grover': grover_tests, 'dj': dj_tests, 'bv': bv_tests}
+
+
+def parse_ns(text):
+    """
+    Parse an n selection: '5', '3:8' (inclusive) or '1,4,6:9'.
+    """
+    ns = set()
+    for part in text.split(','):
+        if ':' in part:
+            low, high = part.split(':')
+            ns.update(range(int(low), int(high) + 1))
+        else:
+            ns.add(int(part))
+    return ns
+
+
+def parse_shard(text):
+    """
+    Parse a shard 'i/N' with 0 <= i < N.
+    """
+    index, count = (int(x) for x in text.split('/'))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {count})")
+    return index, count
+
+
+def in_shard(case_id, shard):
+    """
+    Deterministically assign a case to one of N shards by a stable hash of its
+    id, so every machine agrees without coordination and adding cases doesn't
+    move existing ones.
+    """
+    index, count = shard
+    return zlib.crc32(case_id.encode()) % count == index
+
+
+# Sizes the generated suite covers unless --n says otherwise
+GENERATED_NS = range(1, 11)
+
+
+def select_cases(algorithms, ns=None, shard=(0, 1), suite='hand', seed=0):
+    """
+    The selected test cases, as (algorithm, case id, test case) triples.
+
+    suite is 'hand' for suites() or 'generated' for seeded random oracles
+    from generators.py. Generated case ids are numbered by n, so a case keeps
+    its id (and shard) whatever sizes are selected, and only cases in the
+    shard are generated. Hand-written expectations are checked against
+    ground_truth(); generated ones are exact by construction.
+    """
+    if suite == 'generated':
+        selected = []
+        for name in algorithms:
+            for n in sorted(GENERATED_NS if ns is None else ns):
+                for index in range(generators.CASES_PER_N):
+                    case_id = f"{name}/{n * generators.CASES_PER_N + index}"
+                    if in_shard(case_id, shard):
+                        selected.append((name, case_id, generators.case(name, n, index, seed)))
+        return selected
+
+    all_suites = suites()
+    selected = []
+    for name in algorithms:
+        for index, test in enumerate(all_suites[name]):
+            case_id = f"{name}/{index}"
+            if ns is not None and test[0][0] not in ns:
+                continue
+            if not in_shard(case_id, shard):
+                continue
+            # The hand-written answers must agree with the classical solvers
+            expected = ground_truth(name, test[0])
+            if expected != test[1]:
+                raise ValueError(f"Case '{case_id}' expects {test[1]}, but the classical answer is {expected}")
+            selected.append((name, case_id, test))
+    return selected
+
+
+def ground_truth(name, test_input):
+    """
+    The classical.py answer for a test case, from its tabulated oracle.
+    """
+    n, f = test_input
+    return getattr(classical, SOLVERS[name])(oracle.tabulate(n, f))
+
+
+def to_json(value):
+    # Outputs are ints (possibly numpy ints) or tuples of them
+    return [int(v) for v in value] if isinstance(value, tuple) else int(value)
+
+
+def write_records(records, fmt, file):
+    fields = ['algorithm', 'backend', 'case', 'n', 'output', 'expected', 'passed', 'compile_s', 'run_s']
+    if fmt == 'json':
+        json.dump(records, file, indent=2)
+        file.write('\n')
+    else:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: json.dumps(record[k]) if isinstance(record[k], list) else record[k]
+                             for k in fields})
+
+
+def read_records(path):
+    with open(path) as file:
+        if path.endswith('.json'):
+            return json.load(file)
+        records = []
+        for row in csv.DictReader(file):
+            for key in ('output', 'expected', 'passed', 'n', 'compile_s', 'run_s'):
+                row[key] = json.loads(row[key].lower() if key == 'passed' else row[key])
+            records.append(row)
+        return records
+
+
+def case_order(record):
+    algorithm, index = record['case'].split('/')
+    return list(ALGORITHMS).index(algorithm), record['backend'], int(index)
+
+
+def output_file(path):
+    """
+    Open path for writing, or stdout (left open on exit) if path is None.
+    """
+    return open(path, 'w') if path else contextlib.nullcontext(sys.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the test suites for each algorithm.")
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS),
+                        help="algorithms to run (default: all)")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['qiskit'],
+                        help="backends to run each algorithm on; classical runs the classical.py baselines and "
+                             "out_of_core simulates on a memory-mapped statevector (default: qiskit)")
+    parser.add_argument('--n', type=parse_ns, default=None,
+                        help="sizes to run, e.g. 5, 3:8 or 1,4,6:9 (default: all)")
+    parser.add_argument('--suite', choices=['hand', 'generated'], default='hand',
+                        help="hand-written cases, or seeded random oracles from generators.py (default: hand)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed for --suite generated")
+    parser.add_argument('--shard', type=parse_shard, default=(0, 1), metavar='i/N',
+                        help="run only shard i of N; shards partition the cases deterministically")
+    parser.add_argument('--format', choices=['table', 'json', 'csv'], default='table')
+    parser.add_argument('--output', help="write results here instead of stdout")
+    parser.add_argument('--merge', nargs='+', metavar='FILE',
+                        help="merge json/csv results from shards instead of running anything")
+    parser.add_argument('--precision', choices=['double', 'single'], default='double',
+                        help="statevector precision passed to every qiskit and out_of_core algorithm")
+    parser.add_argument('--parallel', action='store_true',
+                        help="run cases concurrently, splitting cores as policy.current decides")
+    args = parser.parse_args(argv)
+
+    if args.merge:
+        records = sorted((r for path in args.merge for r in read_records(path)), key=case_order)
+        fmt = 'json' if args.format == 'table' else args.format
+        with output_file(args.output) as file:
+            write_records(records, fmt, file)
+        return
+
+    cases = select_cases(args.algorithms, args.n, args.shard, args.suite, args.seed)
+
+    records = []
+    for backend in args.backends:
+        options = backend_options(backend, args.precision)
+        for name in args.algorithms:
+            if backend == 'out_of_core' and name not in OUT_OF_CORE:
+                continue
+            group = [(case_id, test) for algorithm, case_id, test in cases if algorithm == name]
+            if not group:
+                continue
+
+            algorithm = load_algorithm(name, backend)
+            tests = [test for _, test in group]
+            if args.format == 'table':
+                results = test_algorithm(tests, algorithm, parallel=args.parallel, **options)
+            else:
+                results = run_cases(tests, algorithm, options, args.parallel)
+
+            for (case_id, (test_input, expected)), (output, compile_s, run_s) in zip(group, results):
+                records.append({
+                    'algorithm': name, 'backend': backend, 'case': case_id, 'n': test_input[0],
+                    'output': to_json(output), 'expected': to_json(expected),
+                    'passed': output == expected, 'compile_s': compile_s, 'run_s': run_s,
+                })
+
+    if args.format != 'table':
+        with output_file(args.output) as file:
+            write_records(records, args.format, file)
+
+
+if __name__ == "__main__":
+    main()
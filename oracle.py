@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+import backends
+import multiprocessing
+import numpy as np
+import policy
+from multiprocessing import shared_memory
+
+'''
+Oracle inputs for the algorithm classes.
+
+An oracle f is normally a Python function on ints in [0, 2^n). A TruthTable
+is an alternative backed by a bit-packed file on disk, so tables produced by
+an upstream job can be opened with np.memmap instead of being reloaded as
+Python functions. TruthTable is callable, so anything expecting f accepts it.
+TableOracle does the same for a table already in memory, such as the
+generated oracles of generators.py.
+
+Python oracles of at least policy.current.tabulate_threshold input bits are
+tabulated on a pool of forked workers, each evaluating chunks of the inputs
+and writing them straight into a shared memory array. Only fork lets workers
+call an arbitrary f (a lambda can't be pickled to a spawned worker), and it
+is only safe before Aer has run in the process, so after that tabulation is
+serial.
+
+File format (little-endian):
+    bytes 0-3   magic b'QTT1'
+    bytes 4-7   n, the length of the input bitstrings
+    bytes 8-11  width, the number of bits per entry (1, or n for Simon)
+    bytes 12-15 reserved
+    bytes 16-   entries packed back to back, entry x occupying bits
+                [x * width, (x + 1) * width), least significant bit first
+'''
+
+MAGIC = b'QTT1'
+HEADER_SIZE = 16
+
+
+def _value_dtype(width):
+    # Smallest unsigned dtype that holds an entry of the given width
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if width <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError(f"Entries of {width} bits are not supported")
+
+
+class TruthTable:
+    """
+    Bit-packed, memory-mapped truth table of an oracle f.
+
+    Parameters
+    ----------
+    path : str
+        File written by TruthTable.write.
+
+    Examples
+    ----------
+    ```
+    >>> TruthTable.write('f.qtt', 2, [1, 0, 1, 0])
+    >>> f = TruthTable('f.qtt')
+    >>> f(2), f.n, f.width
+    (1, 2, 1)
+    >>> DeutschJozsa(2, f).run()
+    0
+    ```
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as file:
+            header = file.read(HEADER_SIZE)
+        if len(header) != HEADER_SIZE or header[:4] != MAGIC:
+            raise ValueError(f"{path} is not a truth table file")
+
+        self.n, self.width = np.frombuffer(header[4:12], dtype='<u4').tolist()
+        self.dtype = _value_dtype(self.width)
+        self.bits = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE,
+                              shape=((len(self) * self.width + 7) // 8,))
+
+    @classmethod
+    def write(cls, path, n, values, width=1, chunk_size=2 ** 20):
+        """
+        Pack a truth table into a file.
+
+        Parameters
+        ----------
+        path : str
+            File to write.
+        n : int
+            The length of bit string input to f.
+        values : array_like
+            The 2^n entries f(0), f(1), ..., each fitting in width bits.
+        width : int
+            Number of bits per entry.
+        chunk_size : int
+            Number of entries packed at a time (rounded to a multiple of 8).
+
+        """
+        values = np.asarray(values)
+        if len(values) != 2 ** n:
+            raise ValueError(f"Expected 2^{n} entries, got {len(values)}")
+        if len(values) and (values.min() < 0 or int(values.max()) >> width):
+            raise ValueError(f"Entries must be in [0, 2^{width})")
+
+        # Whole bytes per chunk, so chunks can be packed independently
+        chunk_size = max(8, chunk_size - chunk_size % 8)
+        shifts = np.arange(width, dtype=np.uint64)
+
+        with open(path, 'wb') as file:
+            file.write(MAGIC + np.array([n, width, 0], dtype='<u4').tobytes())
+            for start in range(0, len(values), chunk_size):
+                chunk = values[start:start + chunk_size].astype(np.uint64)
+                bits = (chunk[:, None] >> shifts) & 1
+                file.write(np.packbits(bits.astype(np.uint8), bitorder='little').tobytes())
+
+    def __len__(self):
+        return 2 ** self.n
+
+    def __call__(self, x):
+        offset = x * self.width
+        start = offset // 8
+        stop = (offset + self.width + 7) // 8
+        entry = int.from_bytes(self.bits[start:stop].tobytes(), 'little')
+        return (entry >> (offset % 8)) & ((1 << self.width) - 1)
+
+    def chunks(self, chunk_size=2 ** 20):
+        """
+        Decode the table a chunk at a time.
+
+        Each chunk is read through a view of the memory map, so only the
+        decoded chunk is held in memory.
+
+        Parameters
+        ----------
+        chunk_size : int
+            Number of entries per chunk (rounded to a multiple of 8).
+
+        Returns
+        -------
+        result : iterator of (int, np.ndarray)
+            Pairs of the first x in the chunk and f(x), f(x + 1), ...
+
+        """
+        chunk_size = max(8, chunk_size - chunk_size % 8)
+        weights = (1 << np.arange(self.width, dtype=np.uint64))
+
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            raw = self.bits[start * self.width // 8:(stop * self.width + 7) // 8]
+            bits = np.unpackbits(raw, bitorder='little', count=(stop - start) * self.width)
+
+            if self.width == 1:
+                yield start, bits
+            else:
+                values = bits.reshape(-1, self.width).astype(np.uint64) @ weights
+                yield start, values.astype(self.dtype)
+
+    def to_array(self):
+        """
+        Decode the whole table.
+
+        Returns
+        -------
+        result : np.ndarray
+            Array with f(x) at index x.
+
+        """
+        table = np.empty(len(self), dtype=self.dtype)
+        for start, values in self.chunks():
+            table[start:start + len(values)] = values
+        return table
+
+
+class TableOracle:
+    """
+    Oracle given by its truth table in memory.
+
+    Callable like any oracle, but tabulate() and chunks() read the table
+    instead of calling it 2^n times.
+
+    Parameters
+    ----------
+    table : array_like
+        The 2^n entries f(0), f(1), ...
+
+    Examples
+    ----------
+    ```
+    >>> f = TableOracle([1, 0, 1, 0])
+    >>> f(2), f.n
+    (1, 2)
+    >>> DeutschJozsa(2, f).run()
+    0
+    ```
+    """
+
+    def __init__(self, table):
+        self.table = np.asarray(table)
+        size = len(self.table)
+        if size & (size - 1) or size == 0:
+            raise ValueError(f"Truth table must have 2^n entries, got {size}")
+        self.n = size.bit_length() - 1
+
+    def __len__(self):
+        return len(self.table)
+
+    def __call__(self, x):
+        return int(self.table[x])
+
+
+# This worker's oracle, shared memory and output array, set by _start_worker
+_worker = None
+
+
+def _start_worker(f, name, size):
+    # f comes through the fork, never pickled; the output is attached by name
+    global _worker
+    memory = shared_memory.SharedMemory(name=name)
+    _worker = (f, memory, np.ndarray(size, dtype=np.int64, buffer=memory.buf))
+
+
+def _tabulate_chunk(bounds):
+    f, _, table = _worker
+    start, stop = bounds
+    table[start:stop] = np.fromiter((f(x) for x in range(start, stop)), dtype=np.int64, count=stop - start)
+
+
+def can_fork():
+    """
+    Whether tabulation workers can be forked from this process: fork must be
+    available, and Aer must not have run here yet.
+    """
+    return 'fork' in multiprocessing.get_all_start_methods() and not backends.simulated
+
+
+def _tabulate_parallel(n, f, workers):
+    """
+    Evaluate f on every input with a pool of forked workers.
+
+    Each call has its own pool and shared memory, so threads may tabulate
+    concurrently.
+    """
+    size = 2 ** n
+    # Several chunks per worker, so an f that is slow on some inputs still balances
+    chunk_size = -(-size // (8 * workers))
+    bounds = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    memory = shared_memory.SharedMemory(create=True, size=size * 8)
+    try:
+        with multiprocessing.get_context('fork').Pool(
+                workers, initializer=_start_worker, initargs=(f, memory.name, size)) as pool:
+            pool.map(_tabulate_chunk, bounds)
+        table = np.ndarray(size, dtype=np.int64, buffer=memory.buf).copy()
+    finally:
+        memory.close()
+        memory.unlink()
+
+    return table
+
+
+def tabulate(n, f, workers=None):
+    """
+    Evaluate f on every input.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    f : lambda, TruthTable, TableOracle or np.ndarray
+        The oracle. An array is taken to be the table already, and copied
+        as int64.
+    workers : int
+        Number of processes evaluating f. Defaults to
+        policy.current.tabulate_workers(n). Ignored (serial) once Aer has
+        run in this process, see can_fork().
+
+    Returns
+    -------
+    result : np.ndarray
+        Array with f(x) at index x.
+
+    """
+    if isinstance(f, TruthTable):
+        if f.n != n:
+            raise ValueError(f"Truth table is for n = {f.n}, not n = {n}")
+        return f.to_array()
+    if isinstance(f, TableOracle):
+        if f.n != n:
+            raise ValueError(f"Truth table is for n = {f.n}, not n = {n}")
+        # A copy, as callers patch their table in place (Grover.flip)
+        return f.table.astype(np.int64)
+    if isinstance(f, np.ndarray):
+        if len(f) != 2 ** n:
+            raise ValueError(f"Expected 2^{n} entries, got {len(f)}")
+        # A copy, as for TableOracle
+        return np.array(f, dtype=np.int64)
+
+    if workers is None:
+        workers = policy.current.tabulate_workers(n)
+    if workers > 1 and can_fork():
+        return _tabulate_parallel(n, f, workers)
+
+    return np.fromiter((f(x) for x in range(2 ** n)), dtype=np.int64, count=2 ** n)
+
+
+def chunks(n, f, chunk_size=2 ** 20):
+    """
+    Evaluate f on every input, a chunk at a time.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    f : lambda, TruthTable, TableOracle or np.ndarray
+        The oracle.
+    chunk_size : int
+        Number of entries per chunk (rounded to a multiple of 8).
+
+    Returns
+    -------
+    result : iterator of (int, np.ndarray)
+        Pairs of the first x in the chunk and f(x), f(x + 1), ...
+
+    """
+    if isinstance(f, TruthTable):
+        if f.n != n:
+            raise ValueError(f"Truth table is for n = {f.n}, not n = {n}")
+        yield from f.chunks(chunk_size)
+        return
+    if isinstance(f, TableOracle):
+        f = f.table
+
+    chunk_size = max(8, chunk_size - chunk_size % 8)
+    for start in range(0, 2 ** n, chunk_size):
+        stop = min(start + chunk_size, 2 ** n)
+        if isinstance(f, np.ndarray):
+            yield start, f[start:stop]
+        else:
+            yield start, np.fromiter((f(x) for x in range(start, stop)), dtype=np.int64, count=stop - start)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import oracle
+import resources
+import tempfile
+from spectral import fwht
+
+'''
+Out-of-core statevector simulation for Grover, Deutsch-Jozsa and
+Bernstein-Vazirani.
+
+These circuits only ever apply layers of H, diagonal oracles and Z_0 to real
+amplitudes, so they can be simulated without Aer on a statevector kept in a
+memory-mapped file, touching it a block at a time. RAM use is a few blocks
+whatever n is, and the cost is streaming passes over the file:
+    - a layer of H is a Walsh-Hadamard transform: one pass doing the low
+      bits within each block, then one pass per GROUP_BITS high bits,
+      transforming 2^GROUP_BITS blocks strided across the file together
+    - a phase oracle (-1)^f(x) is a streaming sign flip, with f evaluated
+      once into a bit-packed file of marks
+    - H Z_0 H (up to sign) is reflection about the mean: a pass for the sum
+      and a pass to reflect
+    - measurement is a pass for the probability in each block, then a scan
+      of just the blocks the samples land in
+
+Amplitudes go to an unlinked file in the temporary directory (TMPDIR) unless
+a directory is given, so pointing TMPDIR at a fast local disk trades its
+bandwidth for RAM.
+'''
+
+# Amplitudes per block, sized to stay in cache
+BLOCK = 2 ** 16
+
+# High bits transformed per pass of hadamard(), holding 2^GROUP_BITS blocks
+GROUP_BITS = 3
+
+
+def _mapped(shape, dtype, directory):
+    # A memmap over an anonymous temporary file, removed when it's closed
+    file = tempfile.TemporaryFile(dir=directory)
+    file.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return file, np.memmap(file, dtype=dtype, mode='r+', shape=shape)
+
+
+def marks(n, f, block=BLOCK, directory=None):
+    """
+    Evaluate f once into a bit-packed array of f(x) mod 2.
+
+    Parameters
+    ----------
+    n : int
+        The length of bit string input to f.
+    f : lambda, oracle.TruthTable or np.ndarray
+        The oracle.
+    block : int
+        Number of inputs evaluated at a time.
+    directory : str
+        Where to put the file, defaulting to the temporary directory.
+
+    Returns
+    -------
+    result : np.ndarray
+        Bit x (least significant first within each byte) is f(x) mod 2.
+
+    """
+    # A one-bit truth table is already in this format
+    if isinstance(f, oracle.TruthTable) and f.width == 1 and f.n == n:
+        return f.bits
+
+    file, bits = _mapped(((2 ** n + 7) // 8,), np.uint8, directory)
+    for start, values in oracle.chunks(n, f, block):
+        packed = np.packbits(np.asarray(values, dtype=np.int64) & 1, bitorder='little')
+        bits[start // 8:start // 8 + len(packed)] = packed
+
+    # Keep the file open for as long as the map is
+    bits.file = file
+    return bits
+
+
+class Statevector:
+    """
+    Real statevector of n qubits in a memory-mapped file.
+
+    Parameters
+    ----------
+    n : int
+        Number of qubits.
+    precision : str
+        'double' or 'single' amplitudes.
+    block : int
+        Amplitudes processed at a time, a power of 2.
+    directory : str
+        Where to put the file, defaulting to the temporary directory.
+
+    Examples
+    ----------
+    ```
+    >>> state = Statevector(2)
+    >>> state.fill(1 / 2)
+    >>> state.phase(marks(2, lambda x: x == 2))
+    >>> state.reflect()
+    >>> state.sample(4)
+    array([2, 2, 2, 2])
+    ```
+    """
+
+    def __init__(self, n, precision='double', block=BLOCK, directory=None):
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+        if block < 1 or block & (block - 1):
+            raise ValueError(f"Block size must be a power of 2, got {block}")
+
+        self.n = n
+        self.size = 2 ** n
+        self.block = min(block, self.size)
+        self.dtype = np.float64 if precision == 'double' else np.float32
+        self._file, self.amplitudes = _mapped((self.size,), self.dtype, directory)
+
+    def close(self):
+        """
+        Release the map and its file.
+        """
+        if self._file is not None:
+            self.amplitudes = None
+            self._file.close()
+            self._file = None
+
+    def __del__(self):
+        self.close()
+
+    def blocks(self):
+        """
+        Start of every block, in order.
+        """
+        return range(0, self.size, self.block)
+
+    def fill(self, value):
+        """
+        Set every amplitude to value.
+        """
+        for start in self.blocks():
+            self.amplitudes[start:start + self.block] = value
+
+    def phase(self, marks):
+        """
+        Multiply amplitude x by -1 where bit x of marks is set.
+
+        Parameters
+        ----------
+        marks : np.ndarray
+            Bit-packed f(x), as from marks().
+
+        """
+        for start in self.blocks():
+            # Blocks smaller than a byte start partway into one
+            skip = start % 8
+            flips = np.unpackbits(marks[start // 8:(start + self.block + 7) // 8],
+                                  bitorder='little')[skip:skip + self.block].astype(bool)
+            chunk = self.amplitudes[start:start + self.block]
+            chunk[flips] *= -1
+
+    def hadamard(self):
+        """
+        Apply H to every qubit.
+        """
+        low = self.block.bit_length() - 1
+        scale = self.dtype(2 ** (-self.n / 2))
+
+        # Bits within a block, with the normalisation of all n folded in
+        for start in self.blocks():
+            chunk = np.array(self.amplitudes[start:start + self.block])
+            fwht(chunk)
+            chunk *= scale
+            self.amplitudes[start:start + self.block] = chunk
+
+        # Bits [bit, bit + group) pair up entries 2^bit apart, so view the file
+        # as (high, 2^group, 2^bit) and transform along the middle axis
+        bit = low
+        while bit < self.n:
+            group = min(GROUP_BITS, self.n - bit)
+            view = self.amplitudes.reshape(self.size >> (bit + group), 2 ** group, 2 ** bit)
+            for high in range(view.shape[0]):
+                for start in range(0, 2 ** bit, self.block):
+                    tile = np.ascontiguousarray(view[high, :, start:start + self.block].T)
+                    fwht(tile)
+                    view[high, :, start:start + self.block] = tile.T
+            bit += group
+
+    def reflect(self):
+        """
+        Reflect about the uniform state: psi -> 2 mean(psi) - psi.
+
+        This is -H Z_0 H, the diffusion step of Grover's algorithm.
+        """
+        total = sum(float(self.amplitudes[start:start + self.block].sum(dtype=np.float64))
+                    for start in self.blocks())
+        twice_mean = self.dtype(2 * total / self.size)
+
+        for start in self.blocks():
+            chunk = self.amplitudes[start:start + self.block]
+            np.subtract(twice_mean, chunk, out=chunk)
+
+    def sample(self, shots, seed=None):
+        """
+        Measure every qubit, shots times. Only reads the state, so concurrent
+        calls are safe.
+
+        Parameters
+        ----------
+        shots : int
+            Number of measurements.
+        seed : int or np.random.Generator
+            Seed for the measurements.
+
+        Returns
+        -------
+        result : np.ndarray
+            shots outcomes x, in random order.
+
+        """
+        rng = np.random.default_rng(seed)
+
+        # Probability of landing in each block, then where each sample lands
+        weights = np.array([np.square(self.amplitudes[start:start + self.block], dtype=np.float64).sum()
+                            for start in self.blocks()])
+        cdf = np.cumsum(weights)
+        u = np.sort(rng.random(shots)) * cdf[-1]
+        landed = np.minimum(np.searchsorted(cdf, u, side='right'), len(weights) - 1)
+
+        xs = np.empty(shots, dtype=np.int64)
+        for index in np.unique(landed):
+            hits = landed == index
+            start = index * self.block
+            within = np.cumsum(np.square(self.amplitudes[start:start + self.block], dtype=np.float64))
+            offset = u[hits] - (cdf[index - 1] if index else 0)
+            xs[hits] = start + np.minimum(np.searchsorted(within, offset, side='right'), self.block - 1)
+
+        return rng.permutation(xs)
+
+
+def estimate(n, passes, evaluations=0, precision='double', block=BLOCK):
+    """
+    Estimate the cost of a simulation streaming over the statevector.
+
+    Parameters
+    ----------
+    n : int
+        Number of qubits.
+    passes : int
+        Number of passes reading and writing every amplitude.
+    evaluations : int
+        Number of calls to f.
+    precision : str
+        'double' or 'single' amplitudes.
+    block : int
+        Amplitudes processed at a time.
+
+    Returns
+    -------
+    result : resources.Estimate
+        Memory is only what's held at once; the 2^n amplitudes are on disk.
+
+    """
+    itemsize = 8 if precision == 'double' else 4
+    block = min(block, 2 ** n)
+    # A group of blocks plus its transposed copy, and a block of marks
+    working_bytes = 2 * 2 ** GROUP_BITS * block * itemsize + block
+
+    streamed = passes * 2 * 2 ** n * itemsize
+    return resources.Estimate(
+        n, 0, working_bytes, 0,
+        streamed / resources.STREAM_BYTES_PER_SECOND + evaluations / resources.CALLS_PER_SECOND)
+
+
+def hadamard_passes(n, block=BLOCK):
+    """
+    Number of passes Statevector.hadamard makes.
+    """
+    low = min(block, 2 ** n).bit_length() - 1
+    return 1 + -(-(n - low) // GROUP_BITS)
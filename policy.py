@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import contextlib
+import multiprocessing
+import os
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+'''
+Coordination of cores between concurrent jobs and the threads inside each job.
+
+Aer and the BLAS behind NumPy each start their own thread pools sized to the
+whole machine. Running several algorithm instances at once then oversubscribes
+the cores. An ExecutionPolicy splits the cores between inter-instance
+parallelism (worker processes) and intra-simulation threads, based on the
+number of qubits of the job: small statevectors gain nothing from threads,
+so they get one each and as many workers as there are cores; large ones get
+fewer workers with more threads.
+
+The policy also decides when oracle.tabulate spreads the evaluation of a
+Python oracle over worker processes.
+
+All algorithm classes read the process-wide policy (policy.current) when
+constructing and running, and main.test_algorithm uses it to size its pool.
+'''
+
+
+class ExecutionPolicy:
+    """
+    How to divide the available cores for a job of a given size.
+
+    Parameters
+    ----------
+    cores : int
+        Cores available to this process tree. Defaults to the cores this
+        process may run on.
+    parallel_threshold : int
+        Number of qubits below which simulation is kept single-threaded
+        (Aer's own default threshold for statevector parallelism is 14).
+    workers : int
+        Fix the number of concurrent instances instead of choosing it per job.
+    threads : int
+        Fix the threads per instance instead of choosing it per job.
+    tabulate_threshold : int
+        Input length n from which oracles are tabulated on a process pool,
+        or None to always tabulate serially.
+
+    Examples
+    ----------
+    ```
+    >>> policy = ExecutionPolicy(cores=16)
+    >>> policy.split(10), policy.split(15), policy.split(20)
+    ((16, 1), (4, 4), (1, 16))
+    ```
+    """
+
+    def __init__(self, cores=None, parallel_threshold=14, workers=None, threads=None,
+                 tabulate_threshold=16):
+        if cores is None:
+            cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        self.cores = max(1, cores)
+        self.parallel_threshold = parallel_threshold
+        self.workers = workers
+        self.threads = threads
+        self.tabulate_threshold = tabulate_threshold
+
+    def split(self, qubits):
+        """
+        Split the cores for a job simulating the given number of qubits.
+
+        Parameters
+        ----------
+        qubits : int
+            Number of qubits in the simulated circuit.
+
+        Returns
+        -------
+        result : (int, int)
+            Number of concurrent instances, and threads for each instance.
+
+        """
+        threads = self.threads
+        if threads is None:
+            # Double the threads for every qubit past the threshold
+            excess = qubits - self.parallel_threshold
+            threads = 1 if excess < 0 else min(self.cores, 2 ** (excess + 1))
+
+        workers = self.workers
+        if workers is None:
+            workers = max(1, self.cores // threads)
+
+        return workers, threads
+
+    def simulator_options(self, qubits):
+        """
+        Aer run options for a job simulating the given number of qubits.
+        """
+        _, threads = self.split(qubits)
+        return {'max_parallel_threads': threads, 'max_parallel_experiments': 1}
+
+    def tabulate_workers(self, n):
+        """
+        Number of processes to evaluate an oracle on 2^n inputs with.
+
+        A Python oracle costs around a microsecond per call, so below
+        2^tabulate_threshold inputs starting workers costs more than it saves.
+        Pool workers are daemonic and can't start workers of their own, so
+        they always tabulate serially.
+        """
+        if self.tabulate_threshold is None or n < self.tabulate_threshold:
+            return 1
+        if multiprocessing.current_process().daemon:
+            return 1
+        return self.cores
+
+    def blas_limit(self, qubits):
+        """
+        Context manager limiting BLAS threads for a job of the given size.
+
+        Does nothing if threadpoolctl isn't installed.
+        """
+        if threadpool_limits is None:
+            return contextlib.nullcontext()
+        _, threads = self.split(qubits)
+        return threadpool_limits(limits=threads, user_api='blas')
+
+
+# Process-wide policy honoured by the algorithm classes and the harness
+current = ExecutionPolicy()
+
+
+def pool_context():
+    """
+    Multiprocessing context for pools of workers that simulate.
+
+    Not fork: Aer's OpenMP threads don't survive being forked once they've
+    run, so a forked child of a process that has simulated can deadlock.
+    Work for these pools has to be picklable.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def set_policy(policy):
+    """
+    Replace the process-wide policy.
+    """
+    global current
+    current = policy
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+'''
+Puts the repository root, where the shared helpers (backends, oracle, ...)
+live, on sys.path.
+
+Every module in pyquil/ imports this before any of those helpers. Run as a
+script, pyquil/ is on sys.path and this is found there; main.py loads it by
+path before loading a module from pyquil/.
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 
+import threading
+
 import numpy as np
-from pyquil import Program
-from pyquil import get_qc
-from pyquil.gates import *
-from pyquil.quil import DefGate
+
+import _root  # the shared helpers below live in the repository root
+import backends
+import classical
+import oracle
+import resources
 
 
 class DeutschJozsa:
@@ -15,9 +19,23 @@ class DeutschJozsa:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda or oracle.TruthTable
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}.
+    mode : str
+        'qvm' sends every shot to the QVM. 'wavefunction' simulates the
+        program once with the WavefunctionSimulator (noiseless) and samples
+        shots locally from the cached probabilities.
+        'classical' solves from the truth table with classical.py, as a
+        baseline.
+    prescreen : int
+        If nonzero, evaluate f on this many random inputs first and answer
+        balanced without building the circuit if they disagree.
+    prescreen_seed : int
+        Seed for the prescreen's inputs, for reproducible construction.
+    budget : resources.Budget
+        Memory/time limits checked before construction. Defaults to
+        resources.default_budget.
 
     Examples
     ----------
@@ -29,52 +47,125 @@ class DeutschJozsa:
     ```
     """
 
-    def __init__(self, n, f):
+    def __init__(self, n, f, mode='qvm', prescreen=0, prescreen_seed=None, budget=None):
+        if mode not in ('qvm', 'wavefunction', 'classical'):
+            raise ValueError(f"Unknown mode '{mode}'")
+
         self.n = n
         self.f = f
+        self.mode = mode
 
+        # Serialises use of the QVM between concurrent run() calls
+        self._lock = threading.Lock()
         self.uf_definition = None
-        self._construct()
+        self.table = None
+        self.probabilities = None
+
+        # Which path answers run(): 'prescreen', or the mode
+        self.verdict = classical.prescreen(n, f, prescreen, prescreen_seed) if prescreen else None
+        self.answered_by = mode if self.verdict is None else 'prescreen'
+
+        self.cost = self.estimate(n, mode)
+        if self.verdict is not None:
+            return
+
+        budget = resources.default_budget if budget is None else budget
+        budget.check(self.cost)
+
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        else:
+            self._construct()
+
+    @classmethod
+    def estimate(cls, n, mode='qvm'):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'qvm', 'wavefunction' or 'classical'.
+
+        Returns
+        -------
+        result : resources.Estimate
+
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+
+        return resources.estimate_permutation(
+            qubits=n + 1, oracle_qubits=n + 1, gates=1 + (n + 1) + 1 + n + n, evaluations=2 ** n)
 
     def _construct(self):
         """
         Construct program for Deutsch-Jozsa algorithm.
         """
-        self.p = Program()
+        gates = backends.pyquil_gates()
+
+        self.p = backends.program()
         ro = self.p.declare('ro', memory_type='BIT', memory_size=self.n)
 
         # Set helper bit (at index n) to 1
-        self.p += X(self.n)
+        self.p += gates.X(self.n)
 
         # Apply Hadamard to all qubits
-        self.p += [H(q) for q in range(self.n + 1)]
+        self.p += [gates.H(q) for q in range(self.n + 1)]
 
         # Apply U_f to all qubits
         self.p += self._apply_uf(range(self.n + 1))
 
         # Apply Hadamard to first n qubits (ignoring helper bit)
-        self.p += [H(q) for q in range(self.n)]
+        self.p += [gates.H(q) for q in range(self.n)]
+
+        if self.mode == 'wavefunction':
+            # Simulate once; run() samples from these
+            self.probabilities = backends.wavefunction(self.p)
+            return
 
         # Measure first n qubits (ignoring helper bit)
-        self.p += [MEASURE(q, ro[q]) for q in range(self.n)]
+        self.p += [gates.MEASURE(q, ro[q]) for q in range(self.n)]
 
         # Get a QC with n bits + 1 helper bit
-        self.qc = get_qc(f'{self.n + 1}q-qvm')
+        self.qc = backends.get_qc(f'{self.n + 1}q-qvm')
         self.qc.compiler.client.timeout = 1000
         self.executable = self.qc.compile(self.p)
 
-    def run(self):
+    def run(self, shots=None, seed=None):
         """
         Run Deutsch–Jozsa algorithm.
 
+        The instance isn't changed, so run() can be called again, or from
+        several threads at once (QVM jobs are taken one at a time).
+
+        Parameters
+        ----------
+        shots : int
+            Number of measurements, all of which must be 0 for f to be
+            called constant. Defaults to 1.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         -------
         result : int
             Returns 1 if self.f is constant or 0 if self.f is balanced.
 
         """
-        
-        result = self.qc.run(self.executable)
+
+        if self.verdict is not None:
+            return self.verdict
+        if self.mode == 'classical':
+            return classical.deutsch_jozsa(self.table)
+
+        shots = 1 if shots is None else shots
+        if self.mode == 'wavefunction':
+            result = backends.sample(self.probabilities, range(self.n), shots, seed)
+        else:
+            result = backends.run_executable(self.qc, self.executable, shots, self._lock, seed)
 
         # Count number of non-zeros, and if there are none it's constant.
         # The expression is cast to an int (False = 0 => balanced, True = 1 => constant)
@@ -92,22 +183,20 @@ class DeutschJozsa:
         Returns
         -------
         U_f : Gate
-            Z_f gate applied to qubits.
+            U_f gate applied to qubits.
 
         """
 
         if self.uf_definition is None:
-            # Initializes U_f as a 2^(n+1) by 2^(n+1) matrix of zeros
-            U_f = np.zeros((2 ** (self.n + 1),) * 2, dtype=int)
+            table = oracle.tabulate(self.n, self.f)
 
-            # Apply definition of U_f = |x>|b + f(x)> to construct matrix
-            for x in range(2 ** self.n):
-                for b in [0, 1]:
-                    row = (x << 1) ^ b
-                    col = (x << 1) ^ (self.f(x) ^ b)
-                    U_f[row][col] = 1
+            # U_f = |x>|b + f(x)> only permutes basis states, sending
+            # (x << 1) ^ b to itself ^ f(x), so define it by the 2^(n+1)
+            # entry permutation rather than the dense matrix
+            states = np.arange(2 ** (self.n + 1))
+            U_f = states ^ table[states >> 1]
 
-            self.uf_definition = DefGate("U_f", U_f)
+            self.uf_definition = backends.def_permutation_gate("U_f", U_f)
             self.p += self.uf_definition
 
         U_f = self.uf_definition.get_constructor()
@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 
+import threading
+
 import numpy as np
-from pyquil import Program
-from pyquil import get_qc
-from pyquil.gates import *
-from pyquil.quil import DefGate
+
+import _root  # the shared helpers below live in the repository root
+import anf
+import backends
+import classical
+import oracle
+import resources
 
 
 class Grover:
@@ -15,13 +20,22 @@ class Grover:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda or oracle.TruthTable
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}.
     max_iterations : int
         The number of iterations to re-run if the x found
         from running doesn't have f(x) = 1. We decide that f doesn't
         have an x s.t. f(x) = 1 if we reach this number of iterations.
+    mode : str
+        'qvm' sends every shot to the QVM. 'wavefunction' simulates the
+        program once with the WavefunctionSimulator (noiseless) and samples
+        shots locally from the cached probabilities.
+        'classical' solves from the truth table with classical.py, as a
+        baseline.
+    budget : resources.Budget
+        Memory/time limits checked before construction. Defaults to
+        resources.default_budget.
 
     Examples
     ----------
@@ -33,26 +47,75 @@ class Grover:
     ```
     """
 
-    def __init__(self, n, f, max_iterations=5):
+    def __init__(self, n, f, max_iterations=5, mode='qvm', budget=None):
+        if mode not in ('qvm', 'wavefunction', 'classical'):
+            raise ValueError(f"Unknown mode '{mode}'")
+
+        budget = resources.default_budget if budget is None else budget
+        self.cost = self.estimate(n, mode)
+        budget.check(self.cost)
+
         self.n = n
         self.f = f
-        self.iteration = 0
+        self.mode = mode
         self.max_iterations = max_iterations
 
         self.p = None
+        self.qc = None
+        # Serialises use of the QVM between concurrent run() calls
+        self._lock = threading.Lock()
+        self.table = None
+        self.zf = None
         self.zf_definition = None
-        self.z0_definition = None
-        self._construct()
+        self.probabilities = None
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        else:
+            self._construct()
+
+    @classmethod
+    def estimate(cls, n, mode='qvm'):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'qvm', 'wavefunction' or 'classical'.
+
+        Returns
+        -------
+        result : resources.Estimate
+
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+
+        k = int(np.floor(np.pi / 4 * np.sqrt(2 ** n)))
+
+        # Z_f is at worst U_f on n + 1 qubits as a permutation (see
+        # _apply_zf); Z_0 is X, a Z with n - 1 controls, X, counted as compiled
+        z0 = 2 * n + resources.controlled_gates(n - 1)
+        return resources.estimate_permutation(
+            qubits=n + 1, oracle_qubits=n + 1, gates=2 + n + k * (1 + 2 * n + z0) + n,
+            evaluations=2 ** n)
 
     def _construct(self):
         """
         Construct program for Grover's algorithm.
         """
-        self.p = Program()
+        gates = backends.pyquil_gates()
+
+        self.p = backends.program()
         ro = self.p.declare('ro', memory_type='BIT', memory_size=self.n)
 
+        # Helper bit (at index n) in |->, for Z_f by phase kickback
+        self.p += [gates.X(self.n), gates.H(self.n)]
+
         # Apply Hadamard to all qubits
-        self.p += [H(q) for q in range(self.n)]
+        self.p += [gates.H(q) for q in range(self.n)]
 
         # Calculate number of times to apply G to qubits
         k = int(np.floor(np.pi / 4 * np.sqrt(2 ** self.n)))
@@ -60,38 +123,98 @@ class Grover:
         # Apply G to all qubits
         self.p += self._apply_g(range(self.n), k)
 
+        if self.mode == 'wavefunction':
+            # Simulate once; run() samples from these
+            self.probabilities = backends.wavefunction(self.p)
+            return
+
         # Measure all qubits
-        self.p += [MEASURE(q, ro[q]) for q in range(self.n)]
+        self.p += [gates.MEASURE(q, ro[q]) for q in range(self.n)]
 
-        # Get a QC with n bits
-        self.qc = get_qc(f'{self.n}q-qvm')
-        self.qc.compiler.client.timeout = 1000
+        # Get a QC with n bits + 1 helper bit, kept across flip()
+        if self.qc is None:
+            self.qc = backends.get_qc(f'{self.n + 1}q-qvm')
+            self.qc.compiler.client.timeout = 1000
         self.executable = self.qc.compile(self.p)
 
-    def run(self):
+    def run(self, shots=None, seed=None):
         """
         Run Grover's algorithm.
 
+        The instance isn't changed (only flip() changes it), so run() can be
+        called again, or from several threads at once (QVM jobs are taken
+        one at a time).
+
+        Parameters
+        ----------
+        shots : int
+            Number of candidate x to measure and verify. Defaults to
+            max_iterations + 1, a first try and one re-run per iteration.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         -------
         result : int
             Return 1 if there exists x in [0,1] such that f(x) = 1, and 0 otherwise.
 
         """
-        result = self.qc.run(self.executable)
+        if self.mode == 'classical':
+            return classical.grover(self.table)
 
-        # Convert measurement to bits
-        x = int("".join(map(str, result.flatten())), 2)
-
-        # Verify output on oracle, if f(x) == 1, we're done
-        # Else we re-run if we've got more iterations left
-        if self.f(x) == 1:
-            return 1
-        elif self.iteration < self.max_iterations:
-            self.iteration += 1
-            return self.run()
+        # All candidates are measured at once rather than re-running for each
+        shots = self.max_iterations + 1 if shots is None else shots
+        if self.mode == 'wavefunction':
+            result = backends.sample(self.probabilities, range(self.n), shots, seed)
         else:
-            return 0
+            result = backends.run_executable(self.qc, self.executable, shots, self._lock, seed)
+
+        # Verify each distinct candidate on the oracle (as tabulated, including flips)
+        for row in np.unique(np.asarray(result), axis=0):
+            # Convert measurement to bits
+            x = int("".join(map(str, row)), 2)
+            if self.table[x] == 1:
+                return 1
+        return 0
+
+    def flip(self, xs):
+        """
+        Flip f(x) for each x in xs without re-evaluating f.
+
+        Unlike the qiskit Grover, this isn't a patch in O(len(xs)): Z_f is
+        compiled into the executable, so its gates are rebuilt from the
+        patched truth table (O(n 2^n) for the ANF) and the program is
+        recompiled (re-simulated in wavefunction mode). Only the truth table
+        and the QVM connection are reused. Not safe to call while run() is
+        executing on another thread.
+
+        Parameters
+        ----------
+        xs : [int]
+            Inputs whose output to flip. An input listed twice is flipped twice.
+
+        """
+        xs, counts = np.unique(np.asarray(xs, dtype=np.int64), return_counts=True)
+        self.table[xs[counts % 2 == 1]] ^= 1
+
+        if self.mode != 'classical':
+            self.zf = None
+            self.zf_definition = None
+            self._construct()
+
+    def mark(self, xs):
+        """
+        Set f(x) = 1 for each x in xs.
+        """
+        xs = np.unique(np.asarray(xs, dtype=np.int64))
+        self.flip(xs[self.table[xs] != 1])
+
+    def unmark(self, xs):
+        """
+        Set f(x) = 0 for each x in xs.
+        """
+        xs = np.unique(np.asarray(xs, dtype=np.int64))
+        self.flip(xs[self.table[xs] != 0])
 
     def _apply_g(self, qubits, k):
         """
@@ -110,53 +233,78 @@ class Grover:
         G : list
             List of all applications of matrix G to qubits.
         """
+        gates = backends.pyquil_gates()
+
         G = []
 
         # Apply G to qubits k times
         for _ in range(k):
-            G += [self._apply_zf(qubits)]
-            G += [H(q) for q in qubits]
-            G += [self._apply_z0(qubits)]
-            G += [H(q) for q in qubits]
+            G += self._apply_zf(qubits)
+            G += [gates.H(q) for q in qubits]
+            G += self._apply_z0(qubits)
+            G += [gates.H(q) for q in qubits]
 
         return G
 
     def _apply_zf(self, qubits):
         """
-        Define Z_f gate (if not defined) and applies it to qubits.
+        Build Z_f (if not built) and applies it to qubits.
+
+        (-1)^f(x) is the product of (-1)^m(x) over the monomials m in the
+        algebraic normal form of f (anf.py), and each of those is a Z
+        controlled on the rest of the monomial's bits. Every control is
+        decomposed by the compiler, and a random f has about 2^(n-1)
+        monomials of degree about n/2, so when the monomials would compile
+        to more gates than an arbitrary diagonal, Z_f is applied by phase
+        kickback instead: U_f |x>|b> = |x>|b + f(x)> on the helper bit in
+        |->, defined as a 2^(n+1) entry permutation like the U_f of
+        DeutschJozsa. No 2^n x 2^n matrix is defined either way.
 
         Parameters
         ----------
         qubits : [int]
-            Qubits to apply Z_f to.
+            Qubits to apply Z_f to, qubits[0] holding the top bit of x. The
+            helper bit is qubit n.
 
         Returns
         ----------
-        Z_f : Gate
-            Z_f gate applied to qubits
+        Z_f : list
+            Gates applying Z_f to qubits (up to global phase).
 
         """
-
-        if self.zf_definition is None:
-            # Initializes Z_f as a 2^n by 2^n matrix of zeros
-            Z_f = np.eye(2 ** self.n, dtype=int)
-
-            # Apply definition of Z_f = (-1)^{f(x)} to construct matrix
-            for x in range(2 ** self.n):
-                Z_f[x][x] = (-1) ** self.f(x)
-
-            # Multiply by -1 to account for leading minus in G
-            Z_f *= -1
-
-            self.zf_definition = DefGate("Z_f", Z_f)
-            self.p += self.zf_definition
-
-        Z_f = self.zf_definition.get_constructor()
-        return Z_f(*qubits)
+        gates = backends.pyquil_gates()
+        qubits = list(qubits)
+
+        if self.zf is None:
+            if self.table is None:
+                self.table = oracle.tabulate(self.n, self.f)
+
+            # The constant monomial (like the leading minus in G) is a global phase
+            monomials = [m for m, _ in anf.monomials(self.table) if m != 0]
+            cost = sum(resources.controlled_gates(bin(m).count('1') - 1) for m in monomials)
+
+            if cost > resources.diagonal_gates(self.n):
+                # (x << 1) ^ b goes to itself ^ f(x), as in DeutschJozsa
+                states = np.arange(2 ** (self.n + 1))
+                U_f = states ^ (self.table[states >> 1] & 1)
+                self.zf_definition = backends.def_permutation_gate("U_f", U_f)
+                self.p += self.zf_definition
+                self.zf = [self.zf_definition.get_constructor()(*qubits, self.n)]
+                return self.zf
+
+            self.zf = []
+            for monomial in monomials:
+                bits = [qubits[self.n - 1 - j] for j in range(self.n) if monomial >> j & 1]
+                gate = gates.Z(bits[0])
+                for control in bits[1:]:
+                    gate = gate.controlled(control)
+                self.zf.append(gate)
+
+        return self.zf
 
     def _apply_z0(self, qubits):
         """
-        Defines Z_0 gate (if not defined) and applies it to qubits.
+        Builds Z_0 gate by gate: a Z controlled on every qubit being 0.
 
         Parameters
         ----------
@@ -165,18 +313,16 @@ class Grover:
 
         Returns
         ----------
-        Z_0 : Gate
-            Z_0 gate applied to qubits
+        Z_0 : list
+            Gates applying Z_0 to qubits.
 
         """
+        gates = backends.pyquil_gates()
+        qubits = list(qubits)
 
-        if self.z0_definition is None:
-            # Create Z_0 as identity, except with -1 in top-left corner
-            Z_0 = np.eye(2 ** self.n)
-            Z_0[0][0] = -1
-
-            self.z0_definition = DefGate("Z_0", Z_0)
-            self.p += self.z0_definition
+        gate = gates.Z(qubits[-1])
+        for control in qubits[:-1]:
+            gate = gate.controlled(control)
 
-        Z_0 = self.z0_definition.get_constructor()
-        return Z_0(*qubits)
+        flips = [gates.X(q) for q in qubits]
+        return flips + [gate] + flips
@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 
+import threading
+
 import numpy as np
-from pyquil import Program
-from pyquil import get_qc
-from pyquil.gates import *
-from pyquil.quil import DefGate
-from pyquil.api import local_forest_runtime
 import time
 
+import _root  # the shared helpers below live in the repository root
+import anf
+import backends
+import classical
+import oracle
+import resources
+from gf2 import Basis
+
 
 #-----------------------------------------#
 # Functions for classical piece of Simon
@@ -21,42 +26,13 @@ def arr_to_int(arr):
         res += arr[i]*(2**i)
     return res
 
-'''
-    check all equations with the target and make sure they're satisfied
-    Inputs:
-        eqns: list of equations of form {0,1}^n
-        tgt: eqn of form {0,1}^n
-'''
-def simon_check_eqns(eqns, tgt):
-    for e in eqns:
-        if np.dot(e, tgt)%2 != 0:
-            return False
-    return True
-
-'''
-    find all possible target equations.
-        just generate all possible lists of 0,1 (of length n)
-'''
-def findall_tgts(n):
-    input_seqs = [[]]
-    #generation process: in a loop, take all outputs of prev loop and add "output + '0'", "output+'1'"
-    # to the set of new outputs. Do this repeatedly until we have all 2^n strings of length n.
-    for i in range(n):
-        new_arrs = []
-        for seq in input_seqs:
-            new_arrs.append(seq + [0])
-            new_arrs.append(seq + [1])
-        input_seqs = new_arrs
-    return input_seqs
-
-# eqns is a nparray with all equations
+# eqns is a nparray with all equations, one row of bits per equation.
+# Returns the smallest nonzero t satisfying every equation (0 if none does).
 def simon_eqns_solver(eqns, n):
-    tgts = findall_tgts(n)
-    for t in tgts[1:]:
-        r = simon_check_eqns(eqns, t)
-        if r:
-            return arr_to_int(t)
-    return arr_to_int([0, 0, 0])
+    basis = Basis(n)
+    for e in eqns:
+        basis.add(arr_to_int(e))
+    return basis.solve()
 
 #-----------------------------------------#
 # Class for implementing (quantum) Simon
@@ -70,9 +46,30 @@ class Simon:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda or oracle.TruthTable
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}^n.
+    mode : str
+        'qvm' sends the shots to the QVM. 'wavefunction' simulates the
+        program once with the WavefunctionSimulator (noiseless), caches the
+        probabilities and samples the shots locally.
+        'classical' solves from the truth table with classical.py, as a
+        baseline.
+    synthesis : str
+        How U_f is built. 'matrix' defines it as a gate permuting the
+        2^(2n) basis states (DEFGATE ... AS PERMUTATION).
+        'anf' emits one multi-controlled X per monomial of the algebraic
+        normal form of f (anf.py), shared between output bits.
+    chunk_shots : int
+        Shots per execution. Each chunk is folded into a GF(2) basis and
+        run() stops as soon as it has rank n - 1. Defaults to n.
+    max_shots : int
+        Shots after which run() gives up waiting for rank n - 1 and solves
+        with what it has, unless run() is given its own. Defaults to
+        4(n - 1) + 1.
+    budget : resources.Budget
+        Memory/time limits checked before construction. Defaults to
+        resources.default_budget.
 
     Examples
     ----------
@@ -83,14 +80,75 @@ class Simon:
     ```
     """
 
-    def __init__(self, n, f):
+    def __init__(self, n, f, mode='qvm', synthesis='matrix', chunk_shots=None, max_shots=None, budget=None):
+        if mode not in ('qvm', 'wavefunction', 'classical'):
+            raise ValueError(f"Unknown mode '{mode}'")
+        if synthesis not in ('matrix', 'anf'):
+            raise ValueError(f"Unknown synthesis '{synthesis}'")
+
+        budget = resources.default_budget if budget is None else budget
+        self.cost = self.estimate(n, mode, synthesis)
+        budget.check(self.cost)
+
         self.n = n
         self.f = f
+        self.mode = mode
+        self.synthesis = synthesis
+        self.chunk_shots = max(n, 1) if chunk_shots is None else chunk_shots
+        self.max_shots = 4 * (n - 1) + 1 if max_shots is None else max_shots
+        # Serialises use of the QVM between concurrent run() calls
+        self._lock = threading.Lock()
+        self.probabilities = None
+        self.executable = None
+        self.table = None
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        else:
+            self._construct()
+
+    @classmethod
+    def estimate(cls, n, mode='qvm', synthesis='matrix'):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'qvm', 'wavefunction' or 'classical'.
+        synthesis : str
+            'matrix' or 'anf'.
+
+        Returns
+        -------
+        result : resources.Estimate
 
-    def run(self):
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+        if synthesis == 'anf':
+            # At most one mcx per monomial, plus the CNOT fan-out to other output bits
+            return resources.estimate_gates(
+                qubits=2 * n, gates=n + 2 ** n * (1 + 2 * (n - 1)) + n + n, evaluations=2 ** n)
+
+        return resources.estimate_permutation(
+            qubits=2 * n, oracle_qubits=2 * n, gates=n + 1 + n + n, evaluations=2 ** n)
+
+    def run(self, shots=None, seed=None):
         """
         Run Simon's algorithm.
 
+        The instance isn't changed, so run() can be called again, or from
+        several threads at once (QVM jobs are taken one at a time).
+
+        Parameters
+        ----------
+        shots : int
+            Most shots to take before solving, in place of max_shots.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         ----------
         result : int
@@ -98,49 +156,114 @@ class Simon:
             for all x, y: [f(x) = f(y)] iff [(x + y) in {0^n, s}]
 
         """
+        return self.run_counted(shots, seed)[0]
 
-        ### first, build the simon circuit.
-        p = Program()
-        ro = p.declare('ro', memory_type='BIT', memory_size=self.n)
+    def run_counted(self, shots=None, seed=None):
+        """
+        Run Simon's algorithm, also reporting how many shots and how long
+        it took.
 
-        # Apply Hadamard to first n qubits
-        p += [H(q) for q in range(self.n)]
+        Parameters
+        ----------
+        shots : int
+            Most shots to take before solving, in place of max_shots.
+        seed : int
+            Seed for the measurements, for reproducible runs.
 
-        # Apply U_f to all qubits
-        p += self._apply_uf(range(self.n * 2))
+        Returns
+        ----------
+        result : (int, int, float, float)
+            s, as from run(), the number of shots taken, and the seconds
+            spent taking them and solving.
 
-        # Apply Hadamard to first n qubits (ignoring n helper bits)
-        p += [H(q) for q in range(self.n)]
+        """
+        if self.mode == 'classical':
+            return classical.simon(self.table), 0, 0.0, 0.0
+
+        max_shots = self.max_shots if shots is None else shots
+        rng = np.random.default_rng(seed)
+
+        # Fold chunks of shots into the basis until it has rank n - 1, the
+        # most a nonzero s allows
+        t1 = time.time()
+        basis = Basis(self.n)
+        taken = 0
+        while basis.rank < self.n - 1 and taken < max_shots:
+            chunk = min(self.chunk_shots, max_shots - taken)
+            if self.mode == 'wavefunction':
+                rows = backends.sample(self.probabilities, range(self.n), chunk, rng)
+            else:
+                # A fresh seed per chunk, or every chunk would measure the same
+                chunk_seed = None if seed is None else int(rng.integers(2 ** 31))
+                rows = backends.run_executable(self.qc, self.executable, chunk, self._lock,
+                                               chunk_seed, self.chunk_shots)
+            for row in rows:
+                basis.add(int(arr_to_int(row)))
+            taken += chunk
+        run_time = time.time()-t1
+
+        t1 = time.time()
+        soln = basis.solve()
+        # Only s itself has f(s) = f(0), so a candidate that doesn't is
+        # left by too few equations, and f is one-to-one (s = 0)
+        if soln != 0 and self.f(soln) != self.f(0):
+            soln = 0
+        solve_time = time.time()-t1
+
+        return soln, taken, run_time, solve_time
+
+    def _construct(self):
+        """
+        Prepare to take shots: simulate the wavefunction once, or compile the
+        measured program for the QVM.
+        """
+        if self.mode == 'wavefunction':
+            # One simulation; every shot is sampled locally
+            self.probabilities = backends.wavefunction(self._program()[0])
+            return
+
+        gates = backends.pyquil_gates()
+        p, ro = self._program()
 
         # Measure first n qubits (ignoring n helper bits)
-        p += [MEASURE(q, ro[q]) for q in range(self.n)]
+        p += [gates.MEASURE(q, ro[q]) for q in range(self.n)]
 
-        # Run n - 1 times to collect equations
-        num_runs = 4*(self.n - 1)+1
-        p.wrap_in_numshots_loop(num_runs)
+        # The shot count is a parameter of the executable, so compile for
+        # the chunk size and run it once per chunk
+        p.wrap_in_numshots_loop(self.chunk_shots)
 
+        self.qc = backends.get_qc(f'{self.n * 2}q-qvm')  # n bits + n helper bits
+        self.qc.compiler.client.timeout = 1000
+        self.executable = self.qc.compile(p)
 
-        ### now, run it...
-        #with local_forest_runtime():
-        qc = get_qc(f'{self.n * 2}q-qvm')  # n bits + n helper bits
-        qc.compiler.client.timeout = 1000
+    def _program(self):
+        """
+        Build the Simon circuit up to (not including) measurement.
 
-        t1 = time.time()
-        executable = qc.compile(p)
-        cpl_time = time.time()-t1
-        #print(f"exe created! compile time = {cpl_time}")
+        Returns
+        ----------
+        [p, ro] : [Program, MemoryReference]
+            The program and its readout register.
 
-        t1 = time.time()
-        result = qc.run(executable)
-        run_time = (time.time()-t1) / num_runs
-        #print(f"computation finished! avg runtime ={run_time}")
-        #print(result)
+        """
+        gates = backends.pyquil_gates()
 
-        soln = simon_eqns_solver(result, self.n)
-        #print(f"\nFinal Solution: {soln}")
+        p = backends.program()
+        ro = p.declare('ro', memory_type='BIT', memory_size=self.n)
 
-        print(f"\t*** compilation time: {cpl_time}, avg trial runtime: {run_time}")
-        return soln
+        # Apply Hadamard to first n qubits
+        p += [gates.H(q) for q in range(self.n)]
+
+        # Apply U_f to all qubits
+        if self.synthesis == 'anf':
+            p += self._apply_anf_uf(range(self.n * 2))
+        else:
+            p += self._apply_uf(range(self.n * 2))
+
+        # Apply Hadamard to first n qubits (ignoring n helper bits)
+        p += [gates.H(q) for q in range(self.n)]
+
+        return [p, ro]
 
     def _apply_uf(self, qubits):
         """
@@ -158,17 +281,59 @@ class Simon:
 
         """
 
-       # Initializes U_f as a 2^(2n) by 2^(2n) matrix of zeros
-        U_f = np.zeros((2 ** (self.n * 2),) * 2, dtype=int)
+        table = oracle.tabulate(self.n, self.f)
 
-        # Apply definition of U_f = |x>|b + f(x)> to construct matrix
-        for x in range(2 ** self.n):
-            # Number of helper bits is equal to number of qubits
-            for b in range(2 ** self.n):
-                row = (x << self.n) ^ b
-                col = (x << self.n) ^ (self.f(x) ^ b)
-                U_f[row][col] = 1
+        # U_f = |x>|b + f(x)> only permutes basis states, sending
+        # (x << n) ^ b (n helper bits) to itself ^ f(x), so define it by the
+        # 2^(2n) entry permutation rather than the dense matrix
+        states = np.arange(2 ** (self.n * 2))
+        U_f = states ^ table[states >> self.n]
 
-        uf_definition = DefGate("U_f", U_f)
+        uf_definition = backends.def_permutation_gate("U_f", U_f)
         gate = uf_definition.get_constructor()
         return [uf_definition, gate(*qubits)]
+
+    def _apply_anf_uf(self, qubits):
+        """
+        Creates U_f gate by gate from the algebraic normal form of f.
+
+        Input bit j of x is qubits[n - 1 - j] and output bit j is
+        qubits[2n - 1 - j], as in the permutation U_f.
+
+        Parameters
+        ----------
+        qubits : [int]
+            Qubits to apply U_f to.
+
+        Returns
+        ----------
+        U_f : list
+            Gates applying U_f to qubits.
+
+        """
+        gates = backends.pyquil_gates()
+        qubits = list(qubits)
+
+        table = oracle.tabulate(self.n, self.f)
+
+        U_f = []
+        for monomial, outputs in anf.monomials(table, self.n):
+            controls = [qubits[self.n - 1 - j] for j in range(self.n) if monomial >> j & 1]
+            targets = [qubits[2 * self.n - 1 - j] for j in outputs]
+
+            if not controls:
+                # The constant monomial
+                U_f += [gates.X(target) for target in targets]
+                continue
+
+            # X on the first output bit controlled on the monomial's inputs
+            gate = gates.X(targets[0])
+            for control in controls:
+                gate = gate.controlled(control)
+
+            # Fan out: t ^= t0 before and after t0 ^= monomial leaves t ^= monomial,
+            # so the monomial is computed once for every output bit it appears in
+            fan_out = [gates.CNOT(targets[0], target) for target in targets[1:]]
+            U_f += fan_out + [gate] + fan_out
+
+        return U_f
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import os
+from collections import namedtuple
+
+'''
+Cost estimates and admission control for the algorithm classes.
+
+Each algorithm class has an estimate(n, ...) classmethod returning an
+Estimate for the construction it would use, and checks it against a Budget
+before building anything. A scheduler can call estimate() without
+constructing an instance at all.
+
+The model is deliberately coarse. It counts what dominates in practice:
+    - dense oracle matrices (the int8 scratch matrix, the complex128
+      Operator, and each gate instruction made from it)
+    - the statevector the simulator allocates
+    - the O(D^3) unitarity check qiskit runs on every D x D gate instruction
+'''
+
+# Rough throughput used to turn operation counts into seconds
+OPS_PER_SECOND = 1e9
+CALLS_PER_SECOND = 1e6
+# Streaming a memory-mapped file (outofcore.py) through memory
+STREAM_BYTES_PER_SECOND = 5e8
+
+Estimate = namedtuple('Estimate', ['qubits', 'matrix_bytes', 'simulator_bytes', 'gates', 'seconds'])
+
+
+class ResourceError(Exception):
+    """
+    Raised when a construction would exceed the configured Budget.
+    """
+
+
+def physical_memory():
+    """
+    Total physical memory in bytes, or None if it can't be determined.
+    """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class Budget:
+    """
+    Memory and time limits for constructing and running one instance.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Limit on dense matrix plus simulator memory, or None for no limit.
+    max_seconds : float
+        Limit on the estimated construction plus run time, or None for no limit.
+
+    Examples
+    ----------
+    ```
+    >>> budget = Budget(max_bytes=2 ** 30)
+    >>> budget.admits(Simon.estimate(8))
+    False
+    >>> Simon(8, f, budget=budget).mode
+    'analytic'
+    ```
+    """
+
+    def __init__(self, max_bytes=None, max_seconds=None):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+    def admits(self, estimate):
+        if self.max_bytes is not None and estimate.matrix_bytes + estimate.simulator_bytes > self.max_bytes:
+            return False
+        if self.max_seconds is not None and estimate.seconds > self.max_seconds:
+            return False
+        return True
+
+    def check(self, estimate):
+        """
+        Raise ResourceError if the estimate doesn't fit in the budget.
+        """
+        if not self.admits(estimate):
+            raise ResourceError(
+                f"Estimated {(estimate.matrix_bytes + estimate.simulator_bytes) / 2 ** 20:.1f} MiB and "
+                f"{estimate.seconds:.1f} s exceeds budget of "
+                f"{'unlimited' if self.max_bytes is None else f'{self.max_bytes / 2 ** 20:.1f}'} MiB and "
+                f"{'unlimited' if self.max_seconds is None else self.max_seconds} s")
+
+
+# Budget used when an algorithm class isn't given one. Refuses anything that
+# can't fit in physical memory; replace it to change the default everywhere.
+default_budget = Budget(max_bytes=physical_memory())
+
+
+def estimate_circuit(qubits, oracle_qubits, oracle_appends, gates, evaluations,
+                     oracle_matrices=1, oracle_copies=None, precision='double', backend='qiskit'):
+    """
+    Estimate the cost of a circuit built around a dense oracle matrix.
+
+    Parameters
+    ----------
+    qubits : int
+        Number of qubits in the circuit.
+    oracle_qubits : int
+        Number of qubits the dense oracle acts on.
+    oracle_appends : int
+        Number of times an oracle matrix is applied.
+    gates : int
+        Total number of gates, measurements included.
+    evaluations : int
+        Number of calls to f needed to tabulate the oracle.
+    oracle_matrices : int
+        Number of distinct dense matrices (Grover has Z_f and Z_0).
+    oracle_copies : int
+        Number of gate instructions made from the matrices (each is a copy
+        and gets a unitarity check). Defaults to one per append.
+    precision : str
+        'double' or 'single' statevector.
+    backend : str
+        'qiskit' or 'pyquil'.
+
+    Returns
+    -------
+    result : Estimate
+
+    """
+    entries = 4 ** oracle_qubits
+    amplitudes = 2 ** qubits
+    copies = oracle_appends if oracle_copies is None else oracle_copies
+
+    if backend == 'qiskit':
+        # int8 scratch and Operator per matrix, and each UnitaryGate copy
+        matrix_bytes = entries * (17 * oracle_matrices + 16 * copies)
+        # Statevector, plus the matrices assembled into the job
+        simulator_bytes = amplitudes * (16 if precision == 'double' else 8) + 16 * entries * oracle_appends
+        # Unitarity check per copy, then gate application
+        ops = copies * 2 ** (3 * oracle_qubits) + oracle_appends * amplitudes * 2 ** oracle_qubits
+    else:
+        # int matrix plus its Quil text, defined once per matrix
+        matrix_bytes = entries * (8 + 4) * oracle_matrices
+        # QVM statevector plus the parsed gate matrices
+        simulator_bytes = amplitudes * 16 + 16 * entries * oracle_matrices
+        ops = entries * oracle_matrices + oracle_appends * amplitudes * 2 ** oracle_qubits
+
+    ops += gates * amplitudes
+    seconds = ops / OPS_PER_SECOND + evaluations / CALLS_PER_SECOND
+
+    return Estimate(qubits, matrix_bytes, simulator_bytes, gates, seconds)
+
+
+def estimate_permutation(qubits, oracle_qubits, gates, evaluations):
+    """
+    Estimate the cost of a pyquil circuit around an oracle defined as a
+    permutation gate (DEFGATE ... AS PERMUTATION), applied once.
+
+    Parameters
+    ----------
+    qubits : int
+        Number of qubits in the circuit.
+    oracle_qubits : int
+        Number of qubits the oracle acts on.
+    gates : int
+        Total number of gates, measurements included.
+    evaluations : int
+        Number of calls to f needed to tabulate the oracle.
+
+    Returns
+    -------
+    result : Estimate
+
+    """
+    entries = 2 ** oracle_qubits
+    amplitudes = 2 ** qubits
+
+    # int permutation plus its Quil text, about 8 characters an entry
+    matrix_bytes = entries * (8 + 8)
+    # QVM statevector plus the parsed permutation
+    simulator_bytes = amplitudes * 16 + 8 * entries
+    ops = entries + amplitudes + gates * amplitudes
+    seconds = ops / OPS_PER_SECOND + evaluations / CALLS_PER_SECOND
+
+    return Estimate(qubits, matrix_bytes, simulator_bytes, gates, seconds)
+
+
+def estimate_gates(qubits, gates, evaluations=0, precision='double'):
+    """
+    Estimate the cost of a circuit of elementary gates, with no dense oracle.
+
+    Parameters
+    ----------
+    qubits : int
+        Number of qubits in the circuit (ancillas included).
+    gates : int
+        Number of gates. Aer applies multi-controlled gates directly, so
+        they count once; for pyquil, whose compiler decomposes them, count
+        them with controlled_gates().
+    evaluations : int
+        Number of calls to f while building the circuit.
+    precision : str
+        'double' or 'single' statevector.
+
+    Returns
+    -------
+    result : Estimate
+
+    """
+    amplitudes = 2 ** qubits
+    simulator_bytes = amplitudes * (16 if precision == 'double' else 8)
+    seconds = gates * amplitudes / OPS_PER_SECOND + evaluations / CALLS_PER_SECOND
+    return Estimate(qubits, 0, simulator_bytes, gates, seconds)
+
+
+def controlled_gates(controls):
+    """
+    One- and two-qubit gates in a single-qubit gate with the given number of
+    controls, decomposed without ancillas (the Gray code construction:
+    2^controls - 1 controlled roots and 2^controls - 2 CNOTs).
+    """
+    return max(1, 2 ** (controls + 1) - 3)
+
+
+def diagonal_gates(qubits):
+    """
+    One- and two-qubit gates in an arbitrary diagonal unitary on the given
+    number of qubits, decomposed as uniformly controlled Rz: about 2^qubits
+    CNOTs and as many Rz.
+    """
+    return 2 ** (qubits + 1)
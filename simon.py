@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 
+import backends
+import anf
+import classical
 import numpy as np
-from qiskit import *
-from qiskit.quantum_info.operators import Operator
+import oracle
+import policy
+import resources
+from gf2 import Basis
+from spectral import fwht
 
 '''
 Simon Circuit:
@@ -23,29 +29,40 @@ Simon Circuit:
 # Functions for classical piece of Simon
 #-----------------------------------------#
 
+# eqns is a nparray with all equations (each equation is just an int.)
+# Returns the smallest nonzero t satisfying every equation (0 if none does).
+def simon_eqns_solver(eqns, n):
+    basis = Basis(n)
+    for e in eqns:
+        basis.add(int(e))
+    return basis.solve()
+
 '''
-    check all equations with the target and make sure they're satisfied
+    compute the distribution of the measured n qubits straight from the truth table
     Inputs:
-        eqns: list of equations of form {0,1}^n
-        tgt: eqn of form {0,1}^n
+        n: length of bit string input to f
+        table: nparray with f(x) at index x
+    The probability of measuring y is
+        sum_z |sum_{x : f(x) = z} (-1)^(x·y)|^2 / 4^n
+    which is the Walsh-Hadamard transform of C(d) = #{x : f(x) = f(x+d)}, over 4^n.
 '''
-def simon_check_eqns(eqns, tgt):
-    for e in eqns:
-        int_and = (e&tgt)
-        str_and = "{0:b}".format(int_and)
-        sum_and = sum([int(i) for i in str_and])
-        #print(f"{e}, {tgt}, {int_and}, {str_and}, {sum_and}")
-        if sum_and%2 != 0:
-            return False
-    return True
+def simon_distribution(n, table):
+    size = 2 ** n
 
-# eqns is a nparray with all equations (each equation is just an int.)
-def simon_eqns_solver(eqns, n):
-    tgts = list(range(2**n))
-    for t in tgts[1:]:
-        if simon_check_eqns(eqns, t):
-            return t
-    return 0
+    # Sort inputs by output value so each collision class is a contiguous run
+    xs = np.argsort(table, kind='stable')
+    fs = np.asarray(table)[xs]
+
+    # Every x collides with itself, then count pairs k apart within a run
+    collisions = np.zeros(size, dtype=np.int64)
+    collisions[0] = size
+    for k in range(1, size):
+        same = fs[:-k] == fs[k:]
+        if not same.any():
+            break
+        collisions += 2 * np.bincount(xs[:-k][same] ^ xs[k:][same], minlength=size)
+
+    return fwht(collisions) / float(size) ** 2
 
 #-----------------------------------------#
 # Class for implementing (quantum) Simon
@@ -59,11 +76,34 @@ class Simon:
     ----------
     n : int
         The length of bit string input to f.
-    f : lambda
+    f : lambda or oracle.TruthTable
         A function that take as input an int in range [0, 2^n]
         representing binary string {0,1}^n and outputs int {0,1}^n.
         Also, f satisfies the condition:
             for all x, y, [f(x) = f(y)] iff [(x+y) in {0^n, s}], for some bitstring s
+    mode : str
+        'circuit' simulates the 2n qubit circuit on Aer.
+        'analytic' computes the output distribution from the truth table
+        of f and samples from it, without helper qubits.
+        'classical' finds s from colliding pairs in the truth table with
+        classical.py instead, as a baseline.
+    precision : str
+        'double' or 'single'. Single precision halves the memory Aer
+        uses for the statevector (or the analytic distribution). The
+        'matrix' U_f stays complex128 either way, as qiskit and Aer only
+        hold unitaries in double precision.
+    synthesis : str
+        How 'circuit' mode builds U_f. 'matrix' is a dense 2^(2n) x 2^(2n)
+        unitary. 'anf' emits one multi-controlled X per monomial of the
+        algebraic normal form of f (anf.py), shared between output bits.
+    cache : cache.DistributionCache
+        If given, the distribution of the measured qubits is looked up by
+        truth table before building anything (in 'circuit' or 'analytic'
+        mode alike), and run() samples from it.
+    budget : resources.Budget
+        Memory/time limits checked before construction. If 'circuit'
+        mode doesn't fit, 'analytic' mode is used instead. Defaults to
+        resources.default_budget.
 
     Examples
     ----------
@@ -74,26 +114,99 @@ class Simon:
     ```
     """
 
-    def __init__(self, n, f):
+    def __init__(self, n, f, mode='circuit', precision='double', synthesis='matrix', cache=None, budget=None):
+        if mode not in ('circuit', 'analytic', 'classical'):
+            raise ValueError(f"Unknown mode '{mode}'")
+        if precision not in ('double', 'single'):
+            raise ValueError(f"Unknown precision '{precision}'")
+        if synthesis not in ('matrix', 'anf'):
+            raise ValueError(f"Unknown synthesis '{synthesis}'")
+
+        budget = resources.default_budget if budget is None else budget
+        self.cost = self.estimate(n, mode, precision, synthesis)
+        if mode == 'circuit' and not budget.admits(self.cost):
+            # Fall back to the analytic distribution, which needs no 2^(2n) matrix
+            mode = 'analytic'
+            self.cost = self.estimate(n, mode, precision)
+        budget.check(self.cost)
+
         self.n = n
         self.f = f
+        self.mode = mode
+        self.precision = precision
+        self.synthesis = synthesis
+        self.cache = cache
         self.uf = None
+        self.circuit = None
+        self.distribution = None
+        self.table = None
+
+        if self.mode == 'classical':
+            self.table = oracle.tabulate(self.n, self.f)
+        elif self.mode == 'analytic' or self.cache is not None:
+            self.table = oracle.tabulate(self.n, self.f)
+            self.distribution = self.__distribution()
+        else:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
 
-        self.__construct()
+    @classmethod
+    def estimate(cls, n, mode='circuit', precision='double', synthesis='matrix'):
+        """
+        Estimate the resources needed to construct and run an instance.
+
+        Parameters
+        ----------
+        n : int
+            The length of bit string input to f.
+        mode : str
+            'circuit', 'analytic' or 'classical'.
+        precision : str
+            'double' or 'single'.
+        synthesis : str
+            'matrix' or 'anf'.
+
+        Returns
+        -------
+        result : resources.Estimate
+
+        """
+        if mode == 'classical':
+            return classical.estimate(n)
+        if mode == 'analytic':
+            # Truth table, sort order and collision counts, plus the distribution
+            table_bytes = 2 ** n * (3 * 8 + (8 if precision == 'double' else 4))
+            # Sorting by f(x) plus one Walsh-Hadamard transform
+            ops = 2 ** n * 2 * n
+            return resources.Estimate(0, 0, table_bytes, 0,
+                                      ops / resources.OPS_PER_SECOND + 2 ** n / resources.CALLS_PER_SECOND)
+
+        if synthesis == 'anf':
+            # At most one mcx per monomial, plus the CNOT fan-out to other output bits
+            return resources.estimate_gates(
+                qubits=2 * n, gates=n + 2 ** n * (1 + 2 * (n - 1)) + n + n,
+                evaluations=2 ** n, precision=precision)
+
+        return resources.estimate_circuit(
+            qubits=2 * n, oracle_qubits=2 * n, oracle_appends=1,
+            gates=n + 1 + n + n, evaluations=2 ** n, precision=precision)
 
     def __construct(self):
         """
         Construct program for Simon algorithm.
         """
         # Create a Quantum circuit with 2n qubits and n classical bits for measurement
-        self.circuit = QuantumCircuit(2*self.n, self.n)
+        self.circuit = backends.quantum_circuit(2*self.n, self.n)
 
         # Apply Hadamard to operator qubits only
         for q in range(self.n):
             self.circuit.h(q)
 
         # Apply U_f to all qubits
-        self.__apply_uf(list(range(2*self.n)))
+        if self.synthesis == 'anf':
+            self.__apply_anf_uf(list(range(2*self.n)))
+        else:
+            self.__apply_uf(list(range(2*self.n)))
 
         # Apply Hadamard to operator qubits only.
         for q in range(self.n):
@@ -103,38 +216,81 @@ class Simon:
         for q in range(self.n):
             self.circuit.measure(q, q)
 
-    def run(self):
+    def run(self, shots=None, seed=None):
         """
         Run Simon algorithm.
 
+        The instance isn't changed, so run() can be called again, or from
+        several threads at once.
+
+        Parameters
+        ----------
+        shots : int
+            Number of equations to measure. Defaults to 4n.
+        seed : int
+            Seed for the measurements, for reproducible runs.
+
         Returns
         -------
         result : int
             Return a single int, "s"
 
         """
-        simulator = Aer.get_backend('qasm_simulator')
-        numshots = 4*self.n #4*(self.n - 1)
-        job = execute(self.circuit, simulator, shots=numshots)
-        result = job.result()
-        counts = result.get_counts(self.circuit)
-
-        #reverse all outputted bitstrings.
-        rev_keys = [''.join(reversed(e)) for e in list(counts.keys())]
-        equations = [int(e, 2) for e in rev_keys]
-        #utilize classical (brute force) functionality to deduce s.
+        if self.mode == 'classical':
+            return classical.simon(self.table)
+
+        numshots = 4*self.n if shots is None else shots #4*(self.n - 1)
+
+        if self.distribution is not None:
+            samples = np.random.default_rng(seed).choice(2 ** self.n, size=numshots, p=self.distribution)
+            equations = np.unique(samples)
+        else:
+            job = backends.execute(self.circuit, shots=numshots, precision=self.precision, seed=seed,
+                                   **policy.current.simulator_options(self.cost.qubits))
+            result = job.result()
+            counts = result.get_counts(self.circuit)
+
+            #reverse all outputted bitstrings.
+            rev_keys = [''.join(reversed(e)) for e in list(counts.keys())]
+            equations = [int(e, 2) for e in rev_keys]
+
+        #utilize classical (GF(2) elimination) functionality to deduce s.
         s = simon_eqns_solver(equations, self.n)
 
-        ## DEBUG
-        #print(counts)
-        #print('-----')
-        #print(equations)
-        #print('-----')
-        #print(s)
+        # Only s itself has f(s) = f(0), so a candidate that doesn't is
+        # left by too few equations, and f is one-to-one (s = 0)
+        if s != 0 and self.f(s) != self.f(0):
+            s = 0
 
         # return output of classical eqn solver: "s".
         return s
 
+    def __distribution(self):
+        """
+        The distribution of the measured qubits: from the cache if it has it,
+        else computed from the truth table (analytic) or simulated (circuit).
+        """
+        if self.cache is not None:
+            key = self.cache.key('simon', self.n, self.table, self.precision)
+            distribution = self.cache.get(key)
+            if distribution is not None:
+                return distribution
+
+        if self.mode == 'analytic':
+            distribution = simon_distribution(self.n, self.table)
+            if self.precision == 'single':
+                distribution = distribution.astype(np.float32)
+        else:
+            with policy.current.blas_limit(self.cost.qubits):
+                self.__construct()
+                distribution = backends.probabilities(
+                    self.circuit, range(self.n), precision=self.precision,
+                    **policy.current.simulator_options(self.cost.qubits))
+
+        if self.cache is not None:
+            self.cache.put(key, distribution)
+        return distribution
+
     def __apply_uf(self, qubits):
         """
         Define U_f gate (if not defined) that encodes oracle function f and applies it to qubits.
@@ -146,18 +302,53 @@ class Simon:
 
         """
         uf_size = 2 ** (self.n *2)
-        f_size = 2 ** self.n
         if self.uf is None:
+            if self.table is None:
+                self.table = oracle.tabulate(self.n, self.f)
+            table = self.table
+
             # Initializes U_f as a 2^(2n) by 2^(2n) matrix of zeros
-            U_f = np.zeros((uf_size,) * 2, dtype=int)
+            U_f = np.zeros((uf_size,) * 2, dtype=np.int8)
 
-            # Apply definition of U_f = |x>|b + f(x)> to construct matrix
-            for x in range(f_size):
-                for b in range(f_size):
-                    row = (x << self.n) ^ b
-                    col = (x << self.n) ^ (self.f(x) ^ b)
-                    U_f[row][col] = 1
+            # Apply definition of U_f = |x>|b + f(x)> to construct matrix,
+            # where row = (x << n) ^ b and col = row ^ f(x)
+            rows = np.arange(uf_size)
+            U_f[rows, rows ^ table[rows >> self.n]] = 1
 
-            self.uf = Operator(U_f)
+            self.uf = backends.operator(U_f)
 
         self.circuit.append(self.uf, qubits[::-1])
+
+    def __apply_anf_uf(self, qubits):
+        """
+        Applies U_f gate by gate from the algebraic normal form of f.
+
+        Input bit j of x is qubits[n - 1 - j] and output bit j is
+        qubits[2n - 1 - j], as in the dense U_f.
+
+        Parameters
+        -------
+        qubits : [int]
+            Qubits to apply U_f to.
+
+        """
+        if self.table is None:
+            self.table = oracle.tabulate(self.n, self.f)
+
+        for monomial, outputs in anf.monomials(self.table, self.n):
+            controls = [qubits[self.n - 1 - j] for j in range(self.n) if monomial >> j & 1]
+            targets = [qubits[2 * self.n - 1 - j] for j in outputs]
+
+            if not controls:
+                # The constant monomial
+                for target in targets:
+                    self.circuit.x(target)
+                continue
+
+            # Fan out: t ^= t0 before and after t0 ^= monomial leaves t ^= monomial,
+            # so the monomial is computed once for every output bit it appears in
+            for target in targets[1:]:
+                self.circuit.cx(targets[0], target)
+            self.circuit.mcx(controls, targets[0])
+            for target in targets[1:]:
+                self.circuit.cx(targets[0], target)
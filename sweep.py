@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+import argparse
+import generators
+import json
+import main as cli
+import numpy as np
+import os
+import resource
+import resources
+import subprocess
+import sys
+import time
+
+'''
+Scaling sweep: how large an n each algorithm and backend can reach.
+
+For each algorithm and backend, n goes up from --start one at a time. Each
+n runs a generated case (generators.py, so any n has an oracle) in a fresh
+interpreter, which reports its construction and run time and its peak RSS.
+The sweep stops at the first n that
+    - is refused by the class's own estimate() under the memory budget
+    - takes longer than --max-seconds (the child is killed) or fails
+    - peaks above --max-mib
+    - is predicted to exceed --max-seconds from the growth so far
+and reports the largest n that ran, with the growth exponents fitted to the
+times and memory: an exponent of 1 means doubling per extra qubit.
+
+A fresh interpreter per n keeps peak RSS per case and stops a runaway case
+from taking the sweep with it.
+'''
+
+# Growth above the smallest measurement (the constant overhead of start-up
+# and imports) smaller than these is noise, and left out of the fits
+TIME_FLOOR = 0.05
+MEMORY_FLOOR = 2 * 2 ** 20
+
+
+def peak_rss():
+    """
+    Peak resident set size of this process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_child(name, backend, n, seed, precision):
+    """
+    Run one generated case in this process and measure it.
+
+    Returns
+    -------
+    result : dict
+        passed, construction and run time, and peak RSS in bytes.
+
+    """
+    start = time.time()
+    test_input, expected = generators.case(name, n, 0, seed)
+    generate_s = time.time() - start
+
+    algorithm = cli.load_algorithm(name, backend)
+    output, compile_s, run_s = cli.run_case(algorithm, test_input, cli.backend_options(backend, precision))
+
+    return {'passed': bool(output == expected), 'generate_s': generate_s,
+            'compile_s': compile_s, 'run_s': run_s, 'peak_bytes': peak_rss()}
+
+
+def measure(name, backend, n, seed=0, precision='double', timeout=None):
+    """
+    Run one generated case in a fresh interpreter.
+
+    Returns
+    -------
+    result : dict or None
+        As run_child, or None if the case failed or timed out.
+
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    spec = json.dumps([name, backend, n, seed, precision])
+    try:
+        process = subprocess.run([sys.executable, os.path.join(here, 'sweep.py'), '--child', spec],
+                                 cwd=here, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None
+    if process.returncode != 0:
+        return None
+
+    # The algorithms print as they go, so the result is the last line
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def exponent(ns, values, floor):
+    """
+    Fit values ~ base + 2^(c n), base being the smallest value, returning c.
+
+    Only values at least floor above base, and at least 1/16 of the largest
+    growth (so jitter at small n doesn't flatten the fit), are fitted.
+
+    Returns
+    -------
+    result : float or None
+        c, or None if fewer than two values reach the floor.
+
+    """
+    base = min(values, default=0)
+    floor = max(floor, (max(values, default=0) - base) / 16)
+    points = [(n, value - base) for n, value in zip(ns, values) if value - base >= floor]
+    if len(points) < 2:
+        return None
+    xs, ys = zip(*points)
+    return float(np.polyfit(xs, np.log2(ys), 1)[0])
+
+
+def sweep(name, backend, start=1, stop=30, max_seconds=60, max_bytes=None, seed=0, precision='double'):
+    """
+    Increase n until a budget stops it.
+
+    Parameters
+    ----------
+    name : str
+        Algorithm, as in main.ALGORITHMS.
+    backend : str
+        Backend, as in main.BACKENDS.
+    start, stop : int
+        First and last n to try.
+    max_seconds : float
+        Limit on construction plus run time of one case.
+    max_bytes : int
+        Limit on peak memory of one case, or None for no limit.
+    seed : int
+        Seed for generators.case.
+    precision : str
+        'double' or 'single', for the backends that take it.
+
+    Returns
+    -------
+    result : ([dict], str)
+        One row per n that ran, and why the sweep stopped.
+
+    """
+    algorithm = cli.load_algorithm(name, backend)
+    options = cli.backend_options(backend, precision)
+    budget = resources.Budget(max_bytes=max_bytes)
+
+    rows = []
+    for n in range(start, stop + 1):
+        if not budget.admits(algorithm.estimate(n, **options)):
+            return rows, f"estimate for n = {n} exceeds memory budget"
+
+        times = [row['compile_s'] + row['run_s'] for row in rows]
+        growth = exponent([row['n'] for row in rows], times, TIME_FLOOR)
+        if growth is not None and min(times) + (times[-1] - min(times)) * 2 ** growth > max_seconds:
+            return rows, f"n = {n} predicted to exceed {max_seconds} s"
+
+        result = measure(name, backend, n, seed, precision, timeout=max_seconds)
+        if result is None:
+            return rows, f"n = {n} failed or exceeded {max_seconds} s"
+        if not result['passed']:
+            return rows, f"n = {n} gave a wrong answer"
+        if max_bytes is not None and result['peak_bytes'] > max_bytes:
+            return rows, f"n = {n} exceeded memory budget"
+
+        rows.append(dict(result, n=n))
+
+    return rows, f"reached n = {stop}"
+
+
+def summarise(rows):
+    """
+    Largest n and the fitted time and memory exponents of a sweep.
+    """
+    ns = [row['n'] for row in rows]
+    times = [row['compile_s'] + row['run_s'] for row in rows]
+    peaks = [row['peak_bytes'] for row in rows]
+    return {'max_n': max(ns) if ns else None,
+            'time_exponent': exponent(ns, times, TIME_FLOOR),
+            'memory_exponent': exponent(ns, peaks, MEMORY_FLOOR)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the largest feasible n per algorithm and backend.")
+    parser.add_argument('--algorithms', nargs='+', choices=list(cli.ALGORITHMS), default=list(cli.ALGORITHMS))
+    parser.add_argument('--backends', nargs='+', choices=cli.BACKENDS, default=['qiskit'])
+    parser.add_argument('--start', type=int, default=1, help="first n (default: 1)")
+    parser.add_argument('--stop', type=int, default=30, help="last n to try (default: 30)")
+    parser.add_argument('--max-seconds', type=float, default=60,
+                        help="time budget per case (default: 60)")
+    parser.add_argument('--max-mib', type=float, default=None,
+                        help="memory budget per case (default: physical memory)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--precision', choices=['double', 'single'], default='double')
+    parser.add_argument('--format', choices=['table', 'json'], default='table')
+    args = parser.parse_args(argv)
+
+    max_bytes = resources.physical_memory() if args.max_mib is None else int(args.max_mib * 2 ** 20)
+
+    reports = []
+    for backend in args.backends:
+        for name in args.algorithms:
+            if backend == 'out_of_core' and name not in cli.OUT_OF_CORE:
+                continue
+            rows, reason = sweep(name, backend, args.start, args.stop, args.max_seconds, max_bytes,
+                                 args.seed, args.precision)
+            report = dict(summarise(rows), algorithm=name, backend=backend, stopped=reason, rows=rows)
+            reports.append(report)
+
+            if args.format != 'table':
+                continue
+
+            print(f"\nSweep for {name} ({backend})\n" + '-' * 70)
+            print("n\tcompile (s)\truntime (s)\tpeak (MiB)\n" + '-' * 70)
+            for row in rows:
+                print(f"{row['n']}\t{row['compile_s']:.4f}\t\t{row['run_s']:.4f}\t\t{row['peak_bytes'] / 2 ** 20:.1f}")
+
+            def fmt(value):
+                return '-' if value is None else f"{value:.2f}"
+
+            print('-' * 70 + f"\nMax n: {report['max_n']} ({reason})\t"
+                  f"time exponent: {fmt(report['time_exponent'])}\t"
+                  f"memory exponent: {fmt(report['memory_exponent'])}")
+
+    if args.format == 'json':
+        json.dump(reports, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--child':
+        print(json.dumps(run_child(*json.loads(sys.argv[2]))))
+    else:
+        main()
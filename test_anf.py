@@ -0,0 +1,27 @@
+import numpy as np
+
+import anf
+
+
+def test_mobius_is_an_involution():
+    rng = np.random.default_rng(0)
+    for n in range(0, 7):
+        table = rng.integers(0, 2, size=2 ** n)
+        coefficients = anf.mobius(table)[:, 0]
+        assert (anf.mobius(coefficients)[:, 0] == table).all()
+
+
+def test_monomials_reconstruct_f():
+    rng = np.random.default_rng(1)
+    n, width = 4, 3
+    table = rng.integers(0, 2 ** width, size=2 ** n)
+    terms = anf.monomials(table, width)
+
+    for x in range(2 ** n):
+        # Monomial m is 1 at x iff every bit of m is set in x
+        value = 0
+        for monomial, outputs in terms:
+            if monomial & x == monomial:
+                for j in outputs:
+                    value ^= 1 << j
+        assert value == table[x]
@@ -0,0 +1,44 @@
+import numpy as np
+
+import grover
+from cache import DistributionCache
+
+
+def test_second_instance_hits():
+    cache = DistributionCache()
+    first = grover.Grover(3, lambda x: x == 5, cache=cache)
+    second = grover.Grover(3, lambda x: x == 5, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second.circuit is None
+    assert np.array_equal(first.distribution, second.distribution)
+    assert second.run(seed=0) == 1
+
+
+def test_key_depends_on_precision_and_not_dtype():
+    table = np.array([0, 1, 0, 0])
+    key = DistributionCache.key('grover', 2, table)
+    assert key == DistributionCache.key('grover', 2, table.astype(np.uint8))
+    assert key != DistributionCache.key('grover', 2, table, precision='single')
+    assert key != DistributionCache.key('simon', 2, table)
+
+
+def test_least_recently_used_is_evicted():
+    cache = DistributionCache(max_bytes=2 * 8 * 4)
+    keys = [DistributionCache.key('grover', 2, np.eye(4, dtype=int)[i]) for i in range(3)]
+    cache.put(keys[0], np.zeros(4))
+    cache.put(keys[1], np.zeros(4))
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[2], np.zeros(4))
+
+    assert len(cache) == 2 and cache.nbytes == 2 * 8 * 4
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+
+def test_directory_outlives_memory(tmp_path):
+    key = DistributionCache.key('grover', 1, np.array([0, 1]))
+    DistributionCache(directory=str(tmp_path)).put(key, np.array([0.25, 0.75]))
+
+    cache = DistributionCache(directory=str(tmp_path))
+    assert np.array_equal(cache.get(key), [0.25, 0.75])
+    assert cache.hits == 1
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+import backends
+import grover
+import oracle
+from cache import DistributionCache
+from cnf import CNF
+
+DIMACS = """c (x1 or not x2) and (x2 or x3)
+p cnf 3 2
+1 -2 0
+2 3 0
+%
+0
+"""
+
+
+def test_parse_dimacs_truth_table():
+    f = CNF.parse_dimacs(DIMACS)
+    assert f.n == 3
+    assert [f(x) for x in range(8)] == [0, 0, 0, 1, 1, 1, 0, 1]
+
+
+def test_tautological_clauses_are_dropped():
+    f = CNF(2, [[1, -1], [2]])
+    assert f.clauses == [[2]]
+    assert [f(x) for x in range(4)] == [0, 0, 1, 1]
+
+
+def test_rejects_out_of_range_literals():
+    with pytest.raises(ValueError):
+        CNF(2, [[3]])
+    with pytest.raises(ValueError):
+        CNF.parse_dimacs("1 2 0\n")
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_grover_circuit_matches_tabulated_oracle(seed):
+    # Random 3-SAT at the usual ratio of clauses to variables, m = 4.2n
+    n = 5
+    rng = np.random.default_rng(seed)
+    clauses = [[int(v) * int(rng.choice([-1, 1])) for v in rng.choice(np.arange(1, n + 1), 3, replace=False)]
+               for _ in range(21)]
+    f = CNF(n, clauses)
+
+    search = grover.Grover(n, f)
+    # A scratch ancilla and a 5 bit counter, not one ancilla per clause
+    assert search.circuit.num_qubits == n + 1 + 5
+    assert search.cost.qubits == search.circuit.num_qubits
+
+    tabulated = grover.Grover(n, oracle.tabulate(n, f), cache=DistributionCache())
+    assert np.allclose(backends.probabilities(search.circuit, list(range(n))), tabulated.distribution)
@@ -0,0 +1,40 @@
+import numpy as np
+
+import generators
+import main
+
+
+def test_case_answers_match_classical_solvers():
+    for algorithm in main.ALGORITHMS:
+        for n in range(1, 6):
+            for index in range(generators.CASES_PER_N):
+                test_input, expected = generators.case(algorithm, n, index, seed=3)
+                assert main.ground_truth(algorithm, test_input) == expected, (algorithm, n, index)
+
+
+def test_cases_are_reproducible():
+    (_, f), expected = generators.case('simon', 6, 0, seed=7)
+    (_, g), _ = generators.case('simon', 6, 0, seed=7)
+    assert (f.table == g.table).all()
+    assert expected != 0
+
+
+def test_oracles_keep_their_promise():
+    f, _ = generators.deutsch_jozsa(6, balanced=True, seed=0)
+    assert f.table.sum() == 2 ** 5
+
+    f, (a, b) = generators.bernstein_vazirani(6, seed=0)
+    assert all(f(x) == (bin(a & x).count('1') + b) % 2 for x in range(2 ** 6))
+
+    f, s = generators.simon(5, 0b10110, seed=0)
+    values = f.table
+    for x in range(2 ** 5):
+        assert (values == values[x]).sum() == 2 and values[x ^ s] == values[x]
+
+    f, _ = generators.grover(6, marked=3, seed=0)
+    assert np.count_nonzero(f.table) == 3
+
+
+def test_parity():
+    values = np.arange(2 ** 10)
+    assert (generators.parity(values) == [bin(v).count('1') % 2 for v in values]).all()
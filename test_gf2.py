@@ -0,0 +1,29 @@
+import numpy as np
+
+from gf2 import Basis
+
+
+def brute_force(eqns, n):
+    # Smallest nonzero t with e·t = 0 for every e, or 0 if there is none
+    for t in range(1, 2 ** n):
+        if all(bin(e & t).count('1') % 2 == 0 for e in eqns):
+            return t
+    return 0
+
+
+def test_solve_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for n in range(1, 6):
+        for _ in range(50):
+            eqns = rng.integers(0, 2 ** n, size=rng.integers(0, n + 2)).tolist()
+            basis = Basis(n)
+            for e in eqns:
+                basis.add(e)
+            assert basis.solve() == brute_force(eqns, n), (n, eqns)
+
+
+def test_add_reports_independence():
+    basis = Basis(3)
+    assert [basis.add(e) for e in (0b011, 0b001, 0b010, 0b000, 0b100)] == [True, True, False, False, True]
+    assert basis.rank == 3
+    assert basis.solve() == 0
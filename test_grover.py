@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+import cnf
+import grover
+import policy
+import resources
+from cache import DistributionCache
+
+
+def test_flip_patches_every_application_of_zf():
+    # flip() patches Z_f in place, which relies on append not copying it
+    search = grover.Grover(3, lambda x: 0)
+    operations = [instruction.operation for instruction in search.circuit.data]
+    # k = 2 applications of G, each one Z_f and one Z_0
+    assert sum(operation is search.zf for operation in operations) == 2
+    assert sum(operation.name == 'unitary' for operation in operations) == 4
+
+
+def test_mark_and_unmark():
+    search = grover.Grover(2, lambda x: 0)
+    assert search.run(seed=0) == 0
+
+    search.mark([1])
+    assert search.run(seed=0) == 1
+
+    search.unmark([1])
+    assert search.run(seed=0) == 0
+
+
+def test_flip_after_definition_is_synthesised():
+    search = grover.Grover(2, lambda x: 0)
+    assert search.zf.definition is not None
+
+    search.flip([2, 3, 3])
+    assert search.table.tolist() == [0, 0, 1, 0]
+    assert search.run(seed=0) == 1
+
+
+def test_patching_needs_a_tabulated_oracle():
+    search = grover.Grover(3, cnf.CNF(3, [[1, 2]]))
+    for patch in (search.flip, search.mark, search.unmark):
+        with pytest.raises(ValueError):
+            patch([1])
+
+
+def test_batch_matches_single_searches():
+    n = 3
+    fs = [lambda x: 0, lambda x: x == 6, lambda x: x in (1, 2), lambda x: 1]
+    batch = grover.GroverBatch(n, fs)
+    for f, probabilities in zip(fs, batch.probabilities):
+        search = grover.Grover(n, f, cache=DistributionCache())
+        assert np.allclose(probabilities, search.distribution)
+
+    assert batch.run(seed=0).tolist() == [0, 1, 1, 1]
+
+
+def test_batch_never_samples_impossible_outcomes():
+    # For n = 2 one iteration lands on the marked x with probability 1
+    tables = np.eye(4, dtype=np.int64)
+    batch = grover.GroverBatch(2, tables)
+    assert (batch.run(shots=1000, seed=0) == 1).all()
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_partitioned_search_finds_marked_x_in_any_partition(monkeypatch, workers):
+    monkeypatch.setattr(policy, 'current', policy.ExecutionPolicy(workers=workers))
+    for marked in (0b0000, 0b0111, 0b1101):
+        search = grover.PartitionedGrover(4, lambda x: x == marked, partition_bits=2)
+        assert search.run(seed=0) == 1
+    assert grover.PartitionedGrover(4, lambda x: 0, partition_bits=2).run(seed=0) == 0
+
+
+def test_partitioned_search_checks_its_arguments():
+    with pytest.raises(ValueError):
+        grover.PartitionedGrover(3, lambda x: 0, partition_bits=3)
+    with pytest.raises(resources.ResourceError):
+        grover.PartitionedGrover(12, lambda x: 0, budget=resources.Budget(max_bytes=2 ** 10))
@@ -0,0 +1,42 @@
+import argparse
+import json
+
+import pytest
+
+import main
+
+
+def test_shards_partition_the_cases():
+    every = [case_id for _, case_id, _ in main.select_cases(list(main.ALGORITHMS))]
+    shards = [[case_id for _, case_id, _ in main.select_cases(list(main.ALGORITHMS), shard=(i, 3))]
+              for i in range(3)]
+    assert sorted(sum(shards, [])) == sorted(every)
+    assert all(len(shard) for shard in shards)
+
+
+def test_generated_shards_keep_their_ids_across_sizes():
+    small = main.select_cases(['grover'], ns={2, 3}, shard=(1, 2), suite='generated')
+    large = main.select_cases(['grover'], ns={2, 3, 4}, shard=(1, 2), suite='generated')
+    assert {case_id for _, case_id, _ in small} <= {case_id for _, case_id, _ in large}
+
+
+def test_parse_shard():
+    assert main.parse_shard('2/5') == (2, 5)
+    with pytest.raises(argparse.ArgumentTypeError):
+        main.parse_shard('5/5')
+
+
+def test_merged_shards_match_an_unsharded_run(tmp_path):
+    common = ['--backends', 'classical', '--n', '1:3']
+    main.main(common + ['--format', 'json', '--output', str(tmp_path / 'all.json')])
+    main.main(common + ['--shard', '0/2', '--format', 'json', '--output', str(tmp_path / '0.json')])
+    main.main(common + ['--shard', '1/2', '--format', 'csv', '--output', str(tmp_path / '1.csv')])
+    main.main(['--merge', str(tmp_path / '1.csv'), str(tmp_path / '0.json'),
+               '--output', str(tmp_path / 'merged.json')])
+
+    def outcomes(path):
+        with open(path) as file:
+            return [{k: v for k, v in record.items() if not k.endswith('_s')} for record in json.load(file)]
+
+    assert outcomes(tmp_path / 'merged.json') == outcomes(tmp_path / 'all.json')
+    assert all(record['passed'] for record in outcomes(tmp_path / 'all.json'))
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import oracle
+
+
+@pytest.mark.parametrize('n, width', [(3, 1), (4, 4), (5, 3), (4, 12)])
+def test_truth_table_round_trip(tmp_path, n, width):
+    values = np.random.default_rng(0).integers(0, 2 ** width, size=2 ** n)
+    path = str(tmp_path / 'f.qtt')
+    # A chunk size that doesn't divide 2^n, to cover the last partial chunk
+    oracle.TruthTable.write(path, n, values, width=width, chunk_size=24)
+
+    f = oracle.TruthTable(path)
+    assert (f.n, f.width) == (n, width)
+    assert [f(x) for x in range(2 ** n)] == values.tolist()
+    assert (f.to_array() == values).all()
+    assert (np.concatenate([v for _, v in f.chunks(chunk_size=8)]) == values).all()
+    assert (oracle.tabulate(n, f) == values).all()
+
+
+def test_truth_table_write_checks_entries(tmp_path):
+    path = str(tmp_path / 'f.qtt')
+    with pytest.raises(ValueError):
+        oracle.TruthTable.write(path, 2, [0, 1, 2, 1])
+    with pytest.raises(ValueError):
+        oracle.TruthTable.write(path, 2, [0, 1, -1, 1], width=2)
+    with pytest.raises(ValueError):
+        oracle.TruthTable.write(path, 2, [0, 1, 0])
+
+
+def test_truth_table_rejects_other_files(tmp_path):
+    path = tmp_path / 'f.qtt'
+    path.write_bytes(b'not a table')
+    with pytest.raises(ValueError):
+        oracle.TruthTable(str(path))
+
+
+def test_tabulate_copies_tables():
+    table = np.array([0, 1, 1, 0])
+    for f in (table, oracle.TableOracle(table)):
+        copy = oracle.tabulate(2, f)
+        copy[0] = 1
+        assert table[0] == 0
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import bernstein_vazirani
+import grover
+import outofcore
+from spectral import fwht
+
+
+def loaded(n, values, block, precision='double'):
+    state = outofcore.Statevector(n, precision, block=block)
+    state.amplitudes[:] = values
+    return state
+
+
+@pytest.mark.parametrize('n, block', [(3, 2 ** 16), (7, 4), (8, 2), (9, 8), (6, 1)])
+def test_blocked_hadamard_matches_fwht(n, block):
+    values = np.random.default_rng(n).standard_normal(2 ** n)
+    state = loaded(n, values, block)
+    state.hadamard()
+
+    expected = values.copy()
+    fwht(expected)
+    assert np.allclose(state.amplitudes, expected / 2 ** (n / 2))
+
+
+@pytest.mark.parametrize('block', [2, 4, 16])
+def test_phase_and_reflect(block):
+    n = 5
+    values = np.random.default_rng(0).standard_normal(2 ** n)
+    f = lambda x: x % 3 == 1
+    state = loaded(n, values, block)
+    state.phase(outofcore.marks(n, f, block=block))
+    state.reflect()
+
+    flipped = values * np.array([-1 if f(x) else 1 for x in range(2 ** n)])
+    assert np.allclose(state.amplitudes, 2 * flipped.mean() - flipped)
+
+
+def test_sample_follows_amplitudes():
+    n = 6
+    amplitudes = np.random.default_rng(1).standard_normal(2 ** n)
+    amplitudes[::3] = 0
+    amplitudes /= np.linalg.norm(amplitudes)
+    state = loaded(n, amplitudes, block=4)
+
+    shots = 200000
+    xs = state.sample(shots, seed=2)
+    frequencies = np.bincount(xs, minlength=2 ** n) / shots
+    assert frequencies[::3].sum() == 0
+    assert np.abs(frequencies - amplitudes ** 2).max() < 0.01
+    assert np.array_equal(xs, state.sample(shots, seed=2))
+
+
+def test_out_of_core_modes_find_the_answer():
+    assert grover.Grover(6, lambda x: x == 37, mode='out_of_core').run(seed=0) == 1
+    a = 0b101101
+    f = lambda x: bin(a & x).count('1') % 2
+    assert bernstein_vazirani.BernsteinVazirani(6, f, mode='out_of_core').run(seed=0) == (a, 0)
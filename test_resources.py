@@ -0,0 +1,40 @@
+import pytest
+
+import deutsch_jozsa
+import resources
+import simon
+
+
+def test_budget_limits_memory_and_time():
+    estimate = resources.Estimate(qubits=4, matrix_bytes=600, simulator_bytes=500, gates=10, seconds=2.0)
+    assert resources.Budget().admits(estimate)
+    assert resources.Budget(max_bytes=1100, max_seconds=2.0).admits(estimate)
+    assert not resources.Budget(max_bytes=1099).admits(estimate)
+    assert not resources.Budget(max_seconds=1.9).admits(estimate)
+
+    with pytest.raises(resources.ResourceError, match='exceeds budget'):
+        resources.Budget(max_seconds=1).check(estimate)
+
+
+def test_simon_falls_back_to_analytic_distribution():
+    n, s = 4, 0b0110
+    f = lambda x: min(x, x ^ s)
+    circuit = simon.Simon.estimate(n)
+    analytic = simon.Simon.estimate(n, mode='analytic')
+    budget = resources.Budget(max_bytes=analytic.matrix_bytes + analytic.simulator_bytes)
+    assert not budget.admits(circuit)
+
+    instance = simon.Simon(n, f, budget=budget)
+    assert instance.mode == 'analytic' and instance.circuit is None
+    assert instance.cost == analytic
+    assert instance.run(seed=0) == s
+
+
+def test_refused_before_anything_is_built():
+    calls = []
+    f = lambda x: calls.append(x) or 0
+    with pytest.raises(resources.ResourceError):
+        deutsch_jozsa.DeutschJozsa(8, f, budget=resources.Budget(max_bytes=2 ** 10))
+    with pytest.raises(resources.ResourceError):
+        simon.Simon(8, f, budget=resources.Budget(max_bytes=2 ** 10))
+    assert calls == []
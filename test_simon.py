@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import backends
+import oracle
+import simon
+
+
+@pytest.mark.parametrize('n, s', [(1, 1), (2, 3), (3, 5), (4, 6)])
+def test_distribution_matches_circuit(n, s):
+    # An arbitrary 2-to-1 f with secret s
+    f = lambda x: min(x, x ^ s) * 7 % 2 ** n
+    expected = simon.simon_distribution(n, oracle.tabulate(n, f))
+
+    circuit = simon.Simon(n, f).circuit
+    assert np.allclose(backends.probabilities(circuit, list(range(n))), expected)
+    # Every outcome y has y.s = 0
+    assert all(bin(y & s).count('1') % 2 == 0 for y in np.flatnonzero(expected))
+
+
+def test_distribution_of_one_to_one_f_is_uniform():
+    n = 3
+    f = lambda x: x ^ 5
+    expected = np.full(2 ** n, 2.0 ** -n)
+    assert np.allclose(simon.simon_distribution(n, oracle.tabulate(n, f)), expected)
+    assert simon.Simon(n, f, mode='analytic').run(seed=0) == 0
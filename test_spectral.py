@@ -0,0 +1,24 @@
+import numpy as np
+
+import spectral
+
+
+def test_fwht_twice_scales_by_size():
+    rng = np.random.default_rng(0)
+    for n in range(0, 8):
+        a = rng.integers(-5, 5, size=(3, 2 ** n)).astype(np.int64)
+        b = a.copy()
+        spectral.fwht(b)
+        spectral.fwht(b)
+        assert (b == 2 ** n * a).all()
+
+
+def test_spectrum_matches_definition():
+    rng = np.random.default_rng(1)
+    n = 4
+    tables = rng.integers(0, 2, size=(5, 2 ** n))
+    xs = np.arange(2 ** n)
+    dots = np.array([[bin(x & y).count('1') % 2 for x in xs] for y in xs])
+
+    expected = ((-1) ** ((tables[:, None, :] + dots[None, :, :]) % 2)).sum(axis=2)
+    assert (spectral.spectrum(tables) == expected).all()